@@ -2,24 +2,29 @@
 # -*- coding: utf-8 -*-
 
 # import pudb; pu.db
-from collections import OrderedDict
-from logging.handlers import TimedRotatingFileHandler
+from collections import OrderedDict, deque
+from logging.handlers import BufferingHandler, QueueHandler, QueueListener, TimedRotatingFileHandler
 from operator import itemgetter
+from urllib.parse import parse_qsl, urlsplit
+import atexit
 import base64
 import click
+import contextlib
 import copy
-import curses
-import curses.textpad as textpad
+import datetime
 import getpass
+import importlib
 import json
 import logging
+import math
 import os
+import queue
+import random
 import re
-import requests
-import shutil
 import signal
 import sys
-import tempfile
+import threading
+import time
 import traceback
 
 __author__ = 'Davide Barelli'
@@ -44,32 +49,1288 @@ class GlobalAttributes:
     pass
 
 
+class LazyModule(object):
+
+    # the module is imported on the first attribute access: `list', `--version' and the quiet runs
+    # do not pay for the TUI, HTTP and benchmark stacks
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+concurrent_futures = LazyModule('concurrent.futures')
+curses = LazyModule('curses')
+gzip = LazyModule('gzip')
+hashlib = LazyModule('hashlib')
+textpad = LazyModule('curses.textpad')
+http_server = LazyModule('http.server')
+multiprocessing = LazyModule('multiprocessing')
+platform = LazyModule('platform')
+requests = LazyModule('requests')
+shutil = LazyModule('shutil')
+subprocess = LazyModule('subprocess')
+tempfile = LazyModule('tempfile')
+timeit = LazyModule('timeit')
+
+
+class StyleRenderer(object):
+
+    COLORS = {
+        'black': '90',
+        'red': '91',
+        'green': '92',
+        'yellow': '93',
+        'blue': '94',
+        'purple': '95',
+        'cyan': '96',
+        'white': '97',
+        'DeepPink1': '38;5;198',
+        'DeepSkyBlue2': '38;5;38',
+        'IndianRed1': '38;5;203',
+        'SeaGreen2': '38;5;83'
+    }
+
+    def __init__(self, stream=None):
+        # stream: None → the current sys.stdout, which may be replaced (TUI, tests, -o). The terminal is
+        # detected again only when the stream changes, the ANSI prefix of every style is computed once.
+        # enabled: False → never colorize, e.g. when logging to a file
+        self.stream = stream
+        self.enabled = True
+        self.tty = (None, False)
+        self.prefixes = {}
+        for color, code in StyleRenderer.COLORS.items():
+            for bold in [ False, True ]:
+                for underline in [ False, True ]:
+                    attr = ([ '1' ] if bold else []) + ([ '4' ] if underline else []) + ([ '0' ] if not bold and not underline else [])
+                    self.prefixes[(color, bold, underline)] = '\x1b[%sm' % ';'.join(attr + [ code ])
+
+    def is_tty(self):
+        stream = self.stream or sys.stdout
+        if self.tty[0] is not stream:
+            try:
+                self.tty = (stream, stream.isatty())
+            except (AttributeError, ValueError):
+                # no isatty() or closed stream
+                self.tty = (stream, False)
+        return self.tty[1]
+
+    def render(self, msg, color='white', bold=False, underline=False):
+        if not self.enabled or not self.is_tty():
+            return msg
+        bold = bool(bold)
+        underline = bool(underline)
+        prefix = self.prefixes.get((color, bold, underline))
+        if prefix is None:
+            # default to white
+            prefix = self.prefixes[('white', bold, underline)]
+        return f'{prefix}{msg}\x1b[0m'
+
+
+class BatchedStreamHandler(logging.StreamHandler):
+
+    # used by the log listener thread: formatted records are collected and written with a single
+    # call once the queue is empty (or every MAX_BATCH records)
+    MAX_BATCH = 256
+
+    def __init__(self, stream, pending):
+        super().__init__(stream)
+        self.pending = pending
+        self.batch = []
+
+    def emit(self, record):
+        try:
+            self.batch.append(self.format(record) + self.terminator)
+            if len(self.batch) >= BatchedStreamHandler.MAX_BATCH or not self.pending():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.batch:
+                self.stream.write(''.join(self.batch))
+                self.batch = []
+            super().flush()
+        finally:
+            self.release()
+
+
 _priv_attr = GlobalAttributes()
-_priv_attr.colorize = True
+_priv_attr.style = StyleRenderer()
+_priv_attr.log_queue = None
+_priv_attr.log_listener = None
+_priv_attr.http_adapter = None
+_priv_attr.token_cache_lock = threading.Lock()
+
+
+class LazyQueueHandler(QueueHandler):
+
+    def prepare(self, record):
+        # the record is queued as is: message and arguments are rendered by the listener handlers
+        return record
+
+
+class LazyMessage(object):
+
+    # log message argument rendered only when a handler emits the record, e.g.
+    # logger.debug('%s', LazyMessage(json.dumps, j, indent=4))
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+
+def _render_json(obj, color=None):
+    s = json.dumps(obj, indent=4, sort_keys=True)
+    return CSC.highlight(s, color) if color else s
+
+
+def lazy_json(obj, color=None):
+    return LazyMessage(_render_json, obj, color)
+
+
+def lazy_highlight(msg, color='white', bold=False, underline=False):
+    return LazyMessage(CSC.highlight, msg, color, bold=bold, underline=underline)
 
 
 def get_logger(log_file_name=None):
     global _priv_attr
     logger = logging.getLogger(__name__)
+    log_queue = _priv_attr.log_queue or queue.Queue()
     if log_file_name:
         handler = TimedRotatingFileHandler(log_file_name, when='midnight', interval=1, backupCount=15, encoding='utf-8')
         handler.suffix = '%Y-%m-%d.log'
         handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        _priv_attr.colorize = False
+        # do not colorize output when logging to a file
+        _priv_attr.style.enabled = False
         logger.setLevel(logging.INFO)
     else:
-        handler = logging.StreamHandler(sys.stdout)
+        handler = BatchedStreamHandler(sys.stdout, lambda: not log_queue.empty())
         logger.setLevel(logging.DEBUG)
-    logger.addHandler(handler)
+    # records are only queued by the logging threads: a background listener renders and writes them
+    if _priv_attr.log_listener is None:
+        _priv_attr.log_queue = log_queue
+        logger.addHandler(LazyQueueHandler(log_queue))
+        _priv_attr.log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _priv_attr.log_listener.start()
+        atexit.register(stop_logger)
+    else:
+        _priv_attr.log_listener.handlers += (handler, )
     return logger
 
 
-def logger_style_artist(func):
-    def wrapper(*args, **kwargs):
-        global _priv_attr
-        # do not colorize output when logging to a file
-        return func(*args, **kwargs) if _priv_attr.colorize else args[0]
-    return wrapper
+def flush_logs():
+    # wait for the queued records to be written, e.g. before prompting the user
+    if _priv_attr.log_listener is not None:
+        _priv_attr.log_listener.queue.join()
+
+
+def stop_logger():
+    listener = _priv_attr.log_listener
+    if listener is not None:
+        _priv_attr.log_listener = None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+
+
+def prompt(msg):
+    flush_logs()
+    return input(msg)
+
+
+def prompt_password(msg):
+    flush_logs()
+    return getpass.getpass(msg)
+
+
+def get_cache_dir():
+    cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'csctester')
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    return cache_dir
+
+
+def load_json_cache(file_name):
+    try:
+        with open(os.path.join(get_cache_dir(), file_name), 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_json_cache(file_name, content):
+    # write a private temporary file and atomically replace the old one
+    try:
+        path = os.path.join(get_cache_dir(), file_name)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(content, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print('{} {}'.format(CSC.highlight(f'An error occurred while updating the cache file {file_name}', 'yellow'), e), file=sys.stderr)
+        return False
+
+
+class HTTPTiming(threading.local):
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.connect = 0.0
+        self.tls = 0.0
+
+
+# connection setup times of the request currently sent by each thread
+http_timing = HTTPTiming()
+
+
+# the timed connection, pool and adapter classes below are completed with their urllib3/requests
+# base classes by timed_http_adapter(), when the first HTTP session is built
+class TimedHTTPConnection(object):
+
+    def _new_conn(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            http_timing.connect += time.perf_counter() - t0
+
+
+class TimedHTTPSConnection(TimedHTTPConnection):
+
+    def connect(self):
+        # connect() opens the socket through _new_conn() and then performs the TLS handshake
+        tcp_time = http_timing.connect
+        t0 = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            http_timing.tls += time.perf_counter() - t0 - (http_timing.connect - tcp_time)
+
+
+class TimedHTTPAdapter(object):
+
+    pool_classes_by_scheme = {}
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.pool_classes_by_scheme
+
+
+def timed_http_adapter(**kwargs):
+    if _priv_attr.http_adapter is None:
+        import requests.adapters
+        import urllib3
+        http_connection = type('TimedHTTPConnection', (TimedHTTPConnection, urllib3.connection.HTTPConnection), {})
+        https_connection = type('TimedHTTPSConnection', (TimedHTTPSConnection, urllib3.connection.HTTPSConnection), {})
+        pools = {
+            'http': type('TimedHTTPConnectionPool', (urllib3.HTTPConnectionPool, ), { 'ConnectionCls': http_connection }),
+            'https': type('TimedHTTPSConnectionPool', (urllib3.HTTPSConnectionPool, ), { 'ConnectionCls': https_connection })
+        }
+        _priv_attr.http_adapter = type('TimedHTTPAdapter', (TimedHTTPAdapter, requests.adapters.HTTPAdapter), { 'pool_classes_by_scheme': pools })
+    return _priv_attr.http_adapter(**kwargs)
+
+
+class ServiceUnavailable(RuntimeError):
+
+    # a CSC service request that got no response (connection error, timeout, open circuit): the check
+    # sending it is KO, the run goes on
+    pass
+
+
+class CircuitBreaker(object):
+
+    # one per host: after FAILURES consecutive connection errors, timeouts or 5xx responses every request
+    # fails fast for OPEN_TIME seconds, then a single trial request decides whether it closes again
+    FAILURES = 5
+    OPEN_TIME = 30.0
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, host):
+        self.host = host
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.stats = { 'opened': 0, 'rejected': 0 }
+
+    @staticmethod
+    def for_host(host):
+        with CircuitBreaker._instances_lock:
+            if host not in CircuitBreaker._instances:
+                CircuitBreaker._instances[host] = CircuitBreaker(host)
+            return CircuitBreaker._instances[host]
+
+    @staticmethod
+    def for_urls(urls):
+        return [ CircuitBreaker.for_host(h) for h in OrderedDict.fromkeys([ urlsplit(u).netloc for u in urls ]) ]
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened_at >= CircuitBreaker.OPEN_TIME:
+                self.trial = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                self.trial = False
+                return
+            self.failures += 1
+            if self.trial or (self.opened_at is None and self.failures >= CircuitBreaker.FAILURES):
+                self.opened_at = time.monotonic()
+                self.trial = False
+                self.stats['opened'] += 1
+
+
+class Cassette(object):
+
+    # requests and responses of the CSC services, written by --record and served by --replay. Requests
+    # are matched on context, service, method, payload and token: identical requests get the recorded
+    # responses in their order, the last one once exhausted. Gzipped JSON, one list entry per exchange,
+    # readable by the owner only. Secrets are never stored: PINs, OTPs, passwords and Basic credentials
+    # are replaced by a salted hash, tokens and SADs (also in the responses) by a pseudonym derived from
+    # it, which the replayed run sends back unchanged
+    VERSION = 2
+    HASHED_FIELDS = [ 'PIN', 'OTP', 'password', 'client_secret' ]
+    TOKEN_FIELDS = [ 'access_token', 'refresh_token', 'token', 'SAD', 'code' ]
+    PSEUDONYM_PREFIX = 'redacted-'
+
+    def __init__(self, path, replay=False, latency=False):
+        self.path = path
+        self.replaying = replay
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.responses = {}
+        self.salt = os.urandom(16).hex()
+        if replay:
+            self.load()
+
+    def _digest(self, value):
+        return hashlib.sha256((self.salt + str(value)).encode('utf-8')).hexdigest()
+
+    def _pseudonym(self, value):
+        if not isinstance(value, str) or value.startswith(Cassette.PSEUDONYM_PREFIX):
+            return value
+        return Cassette.PSEUDONYM_PREFIX + self._digest(value)[:32]
+
+    def _redact(self, value, field=None):
+        if isinstance(value, dict):
+            return { k: self._redact(v, k) for k, v in value.items() }
+        if isinstance(value, list):
+            return [ self._redact(v, field) for v in value ]
+        if value is None:
+            return None
+        if field in Cassette.HASHED_FIELDS:
+            return 'sha256:' + self._digest(value)
+        if field in Cassette.TOKEN_FIELDS:
+            return self._pseudonym(value)
+        return value
+
+    def _redact_authorization(self, header):
+        if header is None:
+            return None
+        scheme, _, credentials = header.partition(' ')
+        if scheme.lower() == 'bearer':
+            return f'{scheme} {self._pseudonym(credentials)}'
+        return f'{scheme} sha256:{self._digest(credentials)}'
+
+    def _redact_body(self, text):
+        try:
+            j = json.loads(text)
+        except ValueError:
+            return text
+        return json.dumps(self._redact(j), separators=(',', ':'))
+
+    @staticmethod
+    def _key(context, service, method, payload, data, token):
+        return json.dumps([ context, service, method, payload, data, token ], sort_keys=True)
+
+    def _request_key(self, context, service, method, kwargs):
+        return Cassette._key(context, service, method, self._redact(kwargs.get('json')), self._redact(kwargs.get('data')), self._redact_authorization((kwargs.get('headers') or {}).get('Authorization')))
+
+    def load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                j = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f'*** Cannot read cassette {self.path}: {e} ***')
+        if j.get('version') != Cassette.VERSION:
+            raise RuntimeError(f'*** Unsupported cassette version in {self.path} ***')
+        self.salt = j['salt']
+        for i in j['interactions']:
+            key = Cassette._key(i['context'], i['service'], i['method'], i.get('json'), i.get('data'), i.get('token'))
+            self.responses.setdefault(key, deque()).append(i)
+
+    def save(self):
+        with self.lock:
+            content = { 'version': Cassette.VERSION, 'recorded': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'salt': self.salt, 'interactions': self.interactions }
+        # a private temporary file atomically replacing the old one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with gzip.open(os.fdopen(fd, 'wb'), 'wt', encoding='utf-8') as f:
+            json.dump(content, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def record(self, context, service, method, kwargs, latency, r=None, error=None):
+        i = { 'context': context, 'service': service, 'method': method, 'latency': round(latency, 4) }
+        for k in [ 'json', 'data' ]:
+            if kwargs.get(k) is not None:
+                i[k] = self._redact(kwargs[k])
+        token = self._redact_authorization((kwargs.get('headers') or {}).get('Authorization'))
+        if token is not None:
+            i['token'] = token
+        if error is not None:
+            i['error'] = type(error).__name__
+            i['message'] = str(error)
+        else:
+            i['status'] = r.status_code
+            i['headers'] = { k: v for k, v in r.headers.items() if k.lower() in [ 'content-type', 'etag', 'last-modified' ] }
+            i['body'] = self._redact_body(r.text)
+            i['ttfb'] = round(r.elapsed.total_seconds(), 4)
+        with self.lock:
+            self.interactions.append(i)
+
+    def play(self, context, service, method, url, kwargs):
+        key = self._request_key(context, service, method, kwargs)
+        with self.lock:
+            recorded = self.responses.get(key)
+            if not recorded:
+                raise RuntimeError(f'*** {service} request not found in cassette {self.path} ***')
+            i = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        if self.latency:
+            time.sleep(i['latency'])
+        if 'error' in i:
+            raise getattr(requests.exceptions, i['error'], requests.exceptions.RequestException)(i['message'])
+        r = requests.Response()
+        r.status_code = i['status']
+        r.headers = requests.structures.CaseInsensitiveDict(i['headers'])
+        r._content = i['body'].encode('utf-8')
+        r.encoding = 'utf-8'
+        r.url = url
+        r.elapsed = datetime.timedelta(seconds=i['ttfb'])
+        r.request = requests.Request(method, url, headers=kwargs.get('headers'), json=kwargs.get('json'), data=kwargs.get('data')).prepare()
+        return r
+
+
+class PageSizeTuner(object):
+
+    # page sizes yielding at least 5% more credential IDs per second are considered an improvement
+    MIN_GAIN = 1.05
+    MAX_PAGE_BYTES = 1024 * 1024
+
+    def __init__(self, initial, minimum, maximum):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.best_size = None
+        self.best_rate = 0.0
+        self.bytes_per_id = 0.0
+        self.settled = False
+
+    def update(self, requested, received, latency, payload_size, has_next):
+        # hill climbing on the listing throughput: the page size is doubled while it pays off,
+        # then the best one is kept. The last page is shorter and is not representative
+        if received > 0:
+            self.bytes_per_id = payload_size / received
+        if not has_next or received == 0:
+            if self.best_size is None and received > 0:
+                # every credential fits in the first page: its size is the one reported
+                self.best_size = requested
+                self.best_rate = received / latency if latency > 0 else 0.0
+            return
+        if received < requested:
+            # the server caps the page size
+            self.maximum = max(self.minimum, received)
+        rate = received / latency if latency > 0 else 0.0
+        if rate > self.best_rate * PageSizeTuner.MIN_GAIN:
+            self.best_rate = rate
+            self.best_size = min(requested, self.maximum)
+            if not self.settled and payload_size * 2 <= PageSizeTuner.MAX_PAGE_BYTES:
+                self.size = min(self.best_size * 2, self.maximum)
+            else:
+                self.size = self.best_size
+        else:
+            self.settled = True
+            self.size = self.best_size
+
+    def rejected(self, requested):
+        # error response for the requested page size: lower the limit and retry, if still possible
+        if requested <= self.minimum:
+            return False
+        self.maximum = max(self.minimum, requested // 2)
+        self.size = self.maximum if self.best_size is None else min(self.best_size, self.maximum)
+        self.settled = True
+        return True
+
+
+class SADManager(object):
+
+    # the SAD is extended once this fraction of its lifetime has elapsed and re-authorized
+    # in the background once this fraction of numSignatures is left
+    REFRESH_AGE = 0.8
+    LOW_WATER = 0.2
+    DEFAULT_EXPIRES_IN = 3600
+
+    def __init__(self, csc, credential_id, num_signatures, pin=None):
+        self.csc = csc
+        self.credential_id = credential_id
+        self.num_signatures = num_signatures
+        self.pin = csc._get_pin() if pin is None else pin
+        self.low_water = math.ceil(num_signatures * SADManager.LOW_WATER)
+        self.cond = threading.Condition()
+        self.renewing = False
+        self.error = None
+        # SAD → signatures in flight, superseded SADs revoked when their last signature completes
+        self.in_use = {}
+        self.retired = set()
+        self.stats = { 'authorize': 0, 'extend': 0, 'waits': 0, 'wait': 0.0 }
+        self.sad = None
+        self._set_sad(*self._authorize(), self.num_signatures)
+
+    def _request(self, service, payload):
+        headers = { 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.csc.session_key }
+        r = self.csc._service_request(service, 'POST', test_name='sad_manager', headers=headers, json=payload)
+        j = r.json() if r.text else {}
+        if 'error' in j or 'SAD' not in j:
+            raise RuntimeError(f'*** SAD unavailable {"" if "error_description" not in j else (": " + j["error_description"])} ***')
+        return j['SAD'], j.get('expiresIn', SADManager.DEFAULT_EXPIRES_IN)
+
+    def _authorize(self):
+        sad, expires_in = self._request('credentials/authorize', { 'credentialID': self.credential_id, 'numSignatures': self.num_signatures, 'PIN': self.pin })
+        self.stats['authorize'] += 1
+        return sad, expires_in
+
+    def _extend(self, sad):
+        sad, expires_in = self._request('credentials/extendTransaction', { 'credentialID': self.credential_id, 'SAD': sad })
+        self.stats['extend'] += 1
+        return sad, expires_in
+
+    def _set_sad(self, sad, expires_in, remaining):
+        # called with the lock held (or before any caller exists). Returns the superseded SAD, to be
+        # revoked once the lock is released: None if it expired, or if signatures are still in flight
+        # with it (the last one revokes it)
+        now = time.monotonic()
+        superseded = self.sad if self.sad is not None and self.sad != sad and now < self.expires_at else None
+        if superseded is not None and self.in_use.get(superseded):
+            self.retired.add(superseded)
+            superseded = None
+        self.sad = sad
+        self.remaining = remaining
+        self.expires_at = now + expires_in
+        self.refresh_at = now + expires_in * SADManager.REFRESH_AGE
+        self.csc.SAD = sad
+        return superseded
+
+    def _revoke(self, sad):
+        # a failed revocation does not stop the signatures
+        if sad is None:
+            return
+        try:
+            self.csc.single_revoke(sad, noout=True)
+        except RuntimeError:
+            pass
+
+    def _renew(self, sad, extend):
+        try:
+            if extend:
+                try:
+                    new_sad, expires_in = self._extend(sad)
+                    with self.cond:
+                        superseded = self._set_sad(new_sad, expires_in, self.remaining)
+                    self._revoke(superseded)
+                    return
+                except RuntimeError:
+                    pass
+            new_sad, expires_in = self._authorize()
+            with self.cond:
+                superseded = self._set_sad(new_sad, expires_in, self.num_signatures)
+            self._revoke(superseded)
+        except Exception as e:
+            with self.cond:
+                self.error = str(e)
+        finally:
+            with self.cond:
+                self.renewing = False
+                self.cond.notify_all()
+
+    def _start_renewal(self, now, n):
+        # called with the lock held: an aging SAD with enough signatures left for the low-water mark
+        # and a batch of n is extended (the quota is kept), otherwise a new one is authorized, while
+        # callers keep consuming the quota of the current one
+        if self.renewing:
+            return
+        self.renewing = True
+        extend = self.remaining >= max(self.low_water, n) and now < self.expires_at
+        threading.Thread(target=self._renew, args=(self.sad, extend), name='csc-sad-renewal', daemon=True).start()
+
+    def acquire(self, n=1):
+        # reserves n signatures and returns the SAD they have to be performed with, to be released
+        # once they are done
+        if n > self.num_signatures:
+            raise RuntimeError(f'*** {n} signatures exceed the numSignatures of the SAD ({self.num_signatures}) ***')
+        t0 = None
+        with self.cond:
+            while True:
+                if self.error:
+                    raise RuntimeError(self.error)
+                now = time.monotonic()
+                if self.remaining >= n and now < self.expires_at:
+                    break
+                if t0 is None:
+                    t0 = time.perf_counter()
+                self._start_renewal(now, n)
+                self.cond.wait()
+            self.remaining -= n
+            sad = self.sad
+            self.in_use[sad] = self.in_use.get(sad, 0) + 1
+            if self.remaining < max(self.low_water, n) or now >= self.refresh_at:
+                self._start_renewal(now, n)
+            if t0 is not None:
+                self.stats['waits'] += 1
+                self.stats['wait'] += time.perf_counter() - t0
+        return sad
+
+    def release(self, sad):
+        with self.cond:
+            self.in_use[sad] -= 1
+            if self.in_use[sad] > 0:
+                return
+            del self.in_use[sad]
+            if sad not in self.retired:
+                return
+            self.retired.discard(sad)
+        self._revoke(sad)
+
+    def invalidate(self, sad):
+        # the service rejected the SAD: the next caller triggers its renewal
+        with self.cond:
+            if sad == self.sad:
+                self.remaining = 0
+
+    def close(self):
+        with self.cond:
+            while self.renewing:
+                self.cond.wait()
+            sads = list(self.retired) + ([ self.sad ] if self.sad else [])
+            self.retired = set()
+            self.sad = None
+            self.csc.SAD = None
+        for sad in sads:
+            self.csc.single_revoke(sad, noout=True)
+
+
+def http_request_handler(mixin):
+    # BaseHTTPRequestHandler subclass of a request handler mixin, built on first use: http.server is
+    # only imported by the commands serving HTTP
+    if '_handler_class' not in mixin.__dict__:
+        mixin._handler_class = type(mixin.__name__, (mixin, http_server.BaseHTTPRequestHandler), {})
+    return mixin._handler_class
+
+
+class MockCSCHandler(object):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        try:
+            self.server.mock.handle(self)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up, e.g. after its read timeout
+            self.close_connection = True
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+
+class MockCSCServer(object):
+
+    # local stand-in for a CSC remote service: every service of CSC.service_URLs is available under
+    # /csc/v0, the info logo under /logo.png. Select it as `mock://localhost/csc/v0?credentials=1000&latency=20'
+    DEFAULT_OPTIONS = OrderedDict([
+        ('credentials', 10),        # number of credentials of the account
+        ('latency', 5.0),           # median response time (ms)
+        ('jitter', 0.0),            # sigma of the log-normal latency distribution, 0 → constant latency
+        ('sign_latency', 0.0),      # additional signHash time for every digest (ms)
+        ('error_rate', 0.0),        # fraction of 503 responses
+        ('drop_rate', 0.0),         # fraction of connections closed without a response
+        ('slow_page_rate', 0.0),    # fraction of credentials/list pages delayed by slow_page_delay
+        ('slow_page_delay', 500.0), # ms
+        ('max_page_size', 1000),    # maximum credentials/list maxResults
+        ('chain_length', 3),        # certificates of a chain
+        ('expired_rate', 0.0),      # fraction of credentials with an expired certificate
+        ('sad_ttl', 3600),          # SAD expiresIn (s)
+        ('seed', 0)                 # random generator seed
+    ])
+    PIN = '12345678'
+    KEY_ALGOS = [ '1.2.840.113549.1.1.1', '1.2.840.113549.1.1.5', '1.2.840.113549.1.1.14', '1.2.840.113549.1.1.11', '1.2.840.113549.1.1.12', '1.2.840.113549.1.1.13', '1.2.840.113549.1.1.10' ]
+    # expected digest length of every signAlgo (or hashAlgo, with the generic RSA signAlgo)
+    DIGEST_LENGTHS = {
+        '1.2.840.113549.1.1.5': 20,
+        '1.2.840.113549.1.1.14': 28,
+        '1.2.840.113549.1.1.11': 32,
+        '1.2.840.113549.1.1.12': 48,
+        '1.2.840.113549.1.1.13': 64,
+        '1.2.840.113549.1.1.10': 32,
+        '1.3.14.3.2.26': 20,
+        '2.16.840.1.101.3.4.2.4': 28,
+        '2.16.840.1.101.3.4.2.1': 32,
+        '2.16.840.1.101.3.4.2.2': 48,
+        '2.16.840.1.101.3.4.2.3': 64
+    }
+    LOGO = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
+    SIGNATURE = base64.b64encode(bytes(range(256))).decode('utf-8')  # RSA 2048 signature size
+
+    # mock:// context URL → running server
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        self.options = OrderedDict(MockCSCServer.DEFAULT_OPTIONS)
+        for k, v in options.items():
+            if k not in self.options:
+                raise ValueError(f'Unknown mock option {k}')
+            self.options[k] = type(MockCSCServer.DEFAULT_OPTIONS[k])(v)
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.lock = threading.Lock()
+        self.random = random.Random(self.options['seed'])
+        self.credential_IDs = [ f'mock-{i:06d}' for i in range(self.options['credentials']) ]
+        self.credential_index = { c: i for i, c in enumerate(self.credential_IDs) }
+        self.access_tokens = {}  # access token → refresh token (or None)
+        self.refresh_tokens = set()
+        self.SADs = {}  # SAD → { credentialID, remaining signatures, expiration }
+        self.services = {
+            'info': self._info,
+            'auth/login': self._login,
+            'auth/revoke': self._revoke,
+            'credentials/list': self._list,
+            'credentials/info': self._credential_info,
+            'credentials/sendOTP': self._send_otp,
+            'credentials/authorize': self._authorize,
+            'credentials/extendTransaction': self._extend_transaction,
+            'signatures/signHash': self._sign_hash,
+            'signatures/timestamp': self._timestamp
+        }
+
+    @property
+    def context(self):
+        return f'http://{self.host}:{self.port}/csc/v0'
+
+    def start(self):
+        self.httpd = http_server.ThreadingHTTPServer((self.host, self.port), http_request_handler(MockCSCHandler))
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name='csc-mock', daemon=True).start()
+        return self.context
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    @staticmethod
+    def from_context(url):
+        # mock://<host>[:<port>]/csc/v0?<option>=<value>&... → context URL of a running mock server
+        with MockCSCServer._instances_lock:
+            if url not in MockCSCServer._instances:
+                u = urlsplit(url)
+                server = MockCSCServer(u.hostname if u.hostname and u.hostname != 'localhost' else '127.0.0.1', u.port or 0, **dict(parse_qsl(u.query)))
+                server.start()
+                MockCSCServer._instances[url] = server
+            return MockCSCServer._instances[url].context
+
+    @staticmethod
+    def _error(error, description, status=400):
+        return status, { 'error': error, 'error_description': description }
+
+    def _new_token(self):
+        return base64.urlsafe_b64encode(os.urandom(24)).decode('utf-8')
+
+    def _delay(self, ms):
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def handle(self, handler):
+        path = urlsplit(handler.path).path
+        length = int(handler.headers.get('Content-Length') or 0)
+        raw = handler.rfile.read(length) if length else b''
+        with self.lock:
+            drop = self.random.random() < self.options['drop_rate']
+            fail = self.random.random() < self.options['error_rate']
+            latency = self.options['latency'] * (self.random.lognormvariate(0, self.options['jitter']) if self.options['jitter'] > 0 else 1)
+        self._delay(latency)
+        if drop:
+            handler.close_connection = True
+            return
+        if path == '/logo.png':
+            return self._send_logo(handler)
+        if fail:
+            status, body = MockCSCServer._error('server_error', 'Service temporarily unavailable', 503)
+        else:
+            try:
+                j = json.loads(raw) if raw else {}
+                if not isinstance(j, dict):
+                    raise ValueError
+            except ValueError:
+                j = None
+            service = path.split('/csc/v0/', 1)[-1]
+            if j is None:
+                status, body = MockCSCServer._error('invalid_request', 'Invalid JSON body')
+            elif service not in self.services:
+                status, body = MockCSCServer._error('access_denied', 'The user or Remote Service denied the request.')
+            else:
+                status, body = self.services[service](handler.headers, j)
+        self._send(handler, status, body)
+
+    def _send(self, handler, status, body):
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        handler.send_response(status if body is not None or status != 200 else 204)
+        if body is not None:
+            handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _send_logo(self, handler):
+        etag = '"mock-logo"'
+        if handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        content = MockCSCServer.LOGO
+        m = re.match(r'^bytes=(\d+)-(\d*)$', handler.headers.get('Range', ''))
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else len(content) - 1, len(content) - 1)
+            handler.send_response(206)
+            handler.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+            content = content[start:end + 1]
+        else:
+            handler.send_response(200)
+        handler.send_header('Content-Type', 'image/png')
+        handler.send_header('ETag', etag)
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def _session(self, headers):
+        auth = headers.get('Authorization', '')
+        return auth.startswith('Bearer ') and auth[7:] in self.access_tokens
+
+    def _credential(self, j):
+        return j.get('credentialID') if j.get('credentialID') in self.credential_index else None
+
+    def _is_expired(self, credential_id):
+        i = self.credential_index[credential_id]
+        rate = self.options['expired_rate']
+        return int((i + 1) * rate) > int(i * rate)
+
+    def _certificate(self, credential_id, n):
+        # DER sized, deterministic pseudo certificate: the leaf depends on the credential, the CAs are shared
+        seed = f'{credential_id}/0' if n == 0 else f'ca/{n}'
+        return base64.b64encode(random.Random(seed).randbytes(1200 if n == 0 else 1000)).decode('utf-8')
+
+    def _info(self, headers, j):
+        return 200, {
+            'specs': '1.0.3.0',
+            'name': 'CSC mock',
+            'logo': f'http://{self.host}:{self.port}/logo.png',
+            'region': 'IT',
+            'lang': j.get('lang', 'en-US'),
+            'description': 'Local CSC remote service stand-in',
+            'authType': [ 'basic' ],
+            'methods': list(self.services)
+        }
+
+    def _login(self, headers, j):
+        with self.lock:
+            if 'refresh_token' in j:
+                if j['refresh_token'] not in self.refresh_tokens:
+                    return MockCSCServer._error('invalid_request', 'Invalid parameter refresh_token')
+                refresh_token = j['refresh_token']
+            else:
+                auth = headers.get('Authorization', '')
+                try:
+                    user, _, passw = base64.b64decode(auth[6:]).decode('utf-8').partition(':') if auth.startswith('Basic ') else ('', '', '')
+                except ValueError:
+                    user = passw = ''
+                if not user or not passw:
+                    return MockCSCServer._error('authentication_error', 'An error occurred during the authentication process', 401)
+                refresh_token = self._new_token() if j.get('rememberMe') is True else None
+                if refresh_token:
+                    self.refresh_tokens.add(refresh_token)
+            access_token = self._new_token()
+            self.access_tokens[access_token] = refresh_token
+        r = { 'access_token': access_token, 'expires_in': 3600 }
+        if refresh_token and 'refresh_token' not in j:
+            r['refresh_token'] = refresh_token
+        return 200, r
+
+    def _revoke(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        token = j.get('token')
+        if not isinstance(token, str):
+            return MockCSCServer._error('invalid_request', 'Missing (or invalid type) string parameter token')
+        with self.lock:
+            if token in self.refresh_tokens:
+                # the access tokens obtained with a refresh token are revoked with it
+                self.refresh_tokens.discard(token)
+                for t in [ t for t, r in self.access_tokens.items() if r == token ]:
+                    del self.access_tokens[t]
+            self.access_tokens.pop(token, None)
+            self.SADs.pop(token, None)
+        return 200, None
+
+    def _list(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        max_results = j.get('maxResults', 10)
+        if not isinstance(max_results, int) or max_results < 1 or max_results > self.options['max_page_size']:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter maxResults')
+        start = 0
+        if 'pageToken' in j:
+            try:
+                start = int(base64.urlsafe_b64decode(j['pageToken']).decode('utf-8'))
+            except (TypeError, ValueError):
+                start = -1
+            if start < 0 or start >= len(self.credential_IDs):
+                return MockCSCServer._error('invalid_request', 'Invalid parameter pageToken')
+        with self.lock:
+            slow = self.random.random() < self.options['slow_page_rate']
+        if slow:
+            self._delay(self.options['slow_page_delay'])
+        r = { 'credentialIDs': self.credential_IDs[start:start + max_results] }
+        if start + max_results < len(self.credential_IDs):
+            r['nextPageToken'] = base64.urlsafe_b64encode(str(start + max_results).encode('utf-8')).decode('utf-8')
+        return 200, r
+
+    def _credential_info(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        credential_id = self._credential(j)
+        if credential_id is None:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter credentialID')
+        certificates = j.get('certificates', 'single')
+        if certificates not in [ 'none', 'single', 'chain' ]:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter certificates')
+        return 200, self.credential_info(credential_id, certificates, j.get('certInfo') is True, j.get('authInfo') is True)
+
+    def credential_info(self, credential_id, certificates='single', cert_info=False, auth_info=False):
+        expired = self._is_expired(credential_id)
+        r = {
+            'key': { 'status': 'enabled', 'algo': MockCSCServer.KEY_ALGOS, 'len': 2048 },
+            'cert': { 'status': 'expired' if expired else 'valid' },
+            'authMode': 'explicit',
+            'multisign': 100
+        }
+        if certificates != 'none':
+            r['cert']['certificates'] = [ self._certificate(credential_id, n) for n in range(1 if certificates == 'single' else self.options['chain_length']) ]
+        if cert_info:
+            i = self.credential_index[credential_id]
+            r['cert'].update({
+                'issuerDN': 'CN=CSC Mock CA, O=CSC Mock, C=IT',
+                'serialNumber': f'{i + 1:032x}',
+                'subjectDN': f'CN=Mock User {i}, O=CSC Mock, C=IT',
+                'validFrom': '20240101000000Z',
+                'validTo': '20250101000000Z' if expired else '20990101000000Z'
+            })
+        if auth_info:
+            r['PIN'] = { 'presence': 'true', 'format': 'N', 'label': 'PIN', 'description': 'Please enter the signature PIN' }
+            r['OTP'] = { 'presence': 'false' }
+        return r
+
+    def _send_otp(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        if self._credential(j) is None:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter credentialID')
+        return 200, None
+
+    def _new_SAD(self, credential_id, remaining):
+        sad = self._new_token()
+        self.SADs[sad] = { 'credentialID': credential_id, 'remaining': remaining, 'expires': time.monotonic() + self.options['sad_ttl'] }
+        return 200, { 'SAD': sad, 'expiresIn': self.options['sad_ttl'] }
+
+    def _valid_SAD(self, sad, credential_id):
+        # called with the lock held
+        s = self.SADs.get(sad) if isinstance(sad, str) else None
+        if s is not None and s['expires'] < time.monotonic():
+            del self.SADs[sad]
+            return None
+        if s is None or s['credentialID'] != credential_id:
+            return None
+        return s
+
+    def _authorize(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        credential_id = self._credential(j)
+        if credential_id is None:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter credentialID')
+        if not isinstance(j.get('numSignatures'), int) or j['numSignatures'] < 1:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter numSignatures')
+        if not isinstance(j.get('PIN'), str):
+            return MockCSCServer._error('invalid_request', 'Invalid parameter PIN')
+        if 'OTP' in j and not isinstance(j['OTP'], str):
+            return MockCSCServer._error('invalid_request', 'Invalid parameter OTP')
+        if self._is_expired(credential_id):
+            return MockCSCServer._error('invalid_request', 'Invalid certificate status')
+        if j['PIN'] != MockCSCServer.PIN:
+            return MockCSCServer._error('invalid_pin', 'The PIN is invalid')
+        with self.lock:
+            return self._new_SAD(credential_id, j['numSignatures'])
+
+    def _extend_transaction(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        credential_id = self._credential(j)
+        if credential_id is None:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter credentialID')
+        with self.lock:
+            s = self._valid_SAD(j.get('SAD'), credential_id)
+            if s is None:
+                return MockCSCServer._error('invalid_request', 'Invalid parameter SAD')
+            del self.SADs[j['SAD']]
+            return self._new_SAD(credential_id, s['remaining'])
+
+    def _sign_hash(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        credential_id = self._credential(j)
+        if credential_id is None:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter credentialID')
+        hashes = j.get('hash')
+        if not isinstance(hashes, list) or len(hashes) == 0 or not all([ isinstance(h, str) for h in hashes ]):
+            return MockCSCServer._error('invalid_request', 'Invalid parameter hash')
+        sign_algo = j.get('signAlgo')
+        if sign_algo not in MockCSCServer.KEY_ALGOS:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter signAlgo')
+        digest_algo = j.get('hashAlgo') if sign_algo == '1.2.840.113549.1.1.1' else sign_algo
+        if digest_algo not in MockCSCServer.DIGEST_LENGTHS:
+            return MockCSCServer._error('invalid_request', 'Invalid parameter hashAlgo')
+        for h in hashes:
+            try:
+                length = len(base64.b64decode(h, validate=True))
+            except ValueError:
+                length = -1
+            if length != MockCSCServer.DIGEST_LENGTHS[digest_algo]:
+                return MockCSCServer._error('invalid_request', 'Invalid digest value length')
+        with self.lock:
+            s = self._valid_SAD(j.get('SAD'), credential_id)
+            if s is None:
+                return MockCSCServer._error('invalid_request', 'Invalid parameter SAD')
+            if s['remaining'] < len(hashes):
+                return MockCSCServer._error('invalid_request', 'Number of signatures exceeding the SAD numSignatures')
+            s['remaining'] -= len(hashes)
+        self._delay(self.options['sign_latency'] * len(hashes))
+        return 200, { 'signatures': [ MockCSCServer.SIGNATURE ] * len(hashes) }
+
+    def _timestamp(self, headers, j):
+        if not self._session(headers):
+            return MockCSCServer._error('invalid_token', 'Session is invalid', 401)
+        if not isinstance(j.get('hash'), str) or not isinstance(j.get('hashAlgo'), str):
+            return MockCSCServer._error('invalid_request', 'Invalid parameter hash')
+        return 200, { 'timestamp': base64.b64encode(random.Random(j['hash'] + str(j.get('nonce'))).randbytes(1500)).decode('utf-8') }
+
+
+def _serve_mock(options, contexts):
+    # mock server process of the self benchmark: the measured client does not share its interpreter.
+    # The signal handlers of the forked CSC instances must not run here
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = MockCSCServer(**options)
+    contexts.put(server.start())
+    threading.Event().wait()
+
+
+class SelfBenchmark(object):
+
+    # client side overhead of the tester: micro benchmarks of the validation, output and JSON paths,
+    # global_test/scan wall time against a zero latency mock server running in another process
+    DEFAULT_SIZES = [ 10, 1000, 10000 ]
+    DEFAULT_THRESHOLD = 0.1
+    # startup time of `list' and `--version' on top of the bare interpreter startup
+    DEFAULT_STARTUP_BUDGET = 0.25
+    STARTUP_RUNS = 10
+    CHAIN_LENGTH = 10
+    # the rules of the credentials/info `authInfo' test case
+    RULES = [
+        { 'condition': 'in', 'arg': [ 'PIN', 'OTP' ] },
+        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo' ] },
+        { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
+        { 'condition': 'eq', 'arg': { 'key>algo': MockCSCServer.KEY_ALGOS } }
+    ]
+
+    def __init__(self, logger, csc_options=None):
+        self.logger = logger
+        self.csc_options = dict(csc_options or {}, timing_report=None)
+        # the measured code logs to /dev/null, through the same queue as the real output
+        self.devnull = open(os.devnull, 'w')
+        log_queue = queue.Queue()
+        self.null_logger = logging.Logger(f'{__name__}.selfbench')
+        self.null_logger.addHandler(LazyQueueHandler(log_queue))
+        self.log_listener = QueueListener(log_queue, logging.StreamHandler(self.devnull))
+        self.log_listener.start()
+        self.results = OrderedDict()
+
+    def _record(self, name, value, unit, **extra):
+        self.results[name] = dict(extra, value=value, unit=unit)
+        details = ''.join([ f', {k} {v}' for k, v in extra.items() ])
+        self.logger.info(f'{name:<32} {value:>12.3f} {unit}{details}')
+
+    def _micro(self, name, func):
+        # best of 5 runs, each one lasting at least 0.2 s
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        self._record(name, min(timer.repeat(repeat=5, number=number)) / number * 1e6, 'us')
+
+    def _startup_time(self, *args):
+        # median wall time of a fresh interpreter
+        times = []
+        for _ in range(SelfBenchmark.STARTUP_RUNS):
+            t0 = time.perf_counter()
+            subprocess.run([ sys.executable, *args ], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - t0)
+        return sorted(times)[len(times) // 2]
+
+    def startup(self, budget=DEFAULT_STARTUP_BUDGET):
+        # 2 if the tester startup exceeds the budget
+        self.logger.info(CSC.highlight('Startup', bold=True))
+        interpreter = self._startup_time('-c', 'pass')
+        self._record('startup_interpreter', interpreter * 1e3, 'ms')
+        over_budget = 0
+        for name, args in [ ('startup_list', [ 'list' ]), ('startup_version', [ '--version' ]) ]:
+            elapsed = self._startup_time(os.path.abspath(__file__), *args) - interpreter
+            self._record(name, elapsed * 1e3, 'ms', budget=budget * 1e3)
+            if elapsed > budget:
+                over_budget += 1
+                self.logger.error(CSC.highlight(f'{name} exceeds the startup budget: {elapsed * 1e3:.1f} ms > {budget * 1e3:g} ms', 'red', bold=True))
+        return 2 if over_budget else 0
+
+    def micro(self):
+        self.logger.info(CSC.highlight('Micro benchmarks', bold=True))
+        mock = MockCSCServer(credentials=1, chain_length=SelfBenchmark.CHAIN_LENGTH)
+        j = mock.credential_info(mock.credential_IDs[0], 'chain', cert_info=False, auth_info=True)
+        text = json.dumps(j)
+        plan = CSC.compile_expectations(SelfBenchmark.RULES)
+        self._micro('compile_rules', lambda: [ CSC._compile_rule(c) for c in SelfBenchmark.RULES ])
+        self._micro('compile_expectations_cached', lambda: CSC.compile_expectations(SelfBenchmark.RULES))
+        self._micro('validate_response', lambda: CSC.validate_response(plan, j))
+        self._micro('traverse_json', lambda: CSC._traverse_json(j, ('cert', 'certificates')))
+        self._micro('highlight', lambda: CSC.highlight('Credential ID', 'SeaGreen2', bold=True))
+        self._micro('log_record', lambda: self.null_logger.info(CSC.highlight('Using session key', 'yellow')))
+        self._micro('json_loads_chain', lambda: json.loads(text))
+        self._micro('json_dumps_chain', lambda: json.dumps(j, indent=4, sort_keys=True))
+        self._micro('log_json_chain', lambda: self.null_logger.debug('%s', lazy_json(j)))
+        self.log_listener.queue.join()
+
+    def _macro(self, context, name, size):
+        csc = CSC('selfbench', 'selfbench', context=context, quiet=True, logger=self.null_logger, **self.csc_options)
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(self.devnull):
+                getattr(csc, name)()
+        except SystemExit:
+            pass
+        elapsed = time.perf_counter() - t0
+        requests = csc.get_request_count()
+        csc.http_session.close()
+        self._record(f'{name}[{size}]', elapsed, 's', requests=requests, error_level=csc.error_level)
+
+    def macro(self, sizes=DEFAULT_SIZES):
+        self.logger.info(CSC.highlight('End-to-end benchmarks', bold=True))
+        for size in sizes:
+            contexts = multiprocessing.Queue()
+            server = multiprocessing.Process(target=_serve_mock, args=({ 'credentials': size, 'latency': 0 }, contexts), daemon=True)
+            server.start()
+            try:
+                context = contexts.get(timeout=30)
+                self._macro(context, 'global_test', size)
+                self._macro(context, 'scan', size)
+            finally:
+                server.terminate()
+                server.join()
+
+    def close(self):
+        self.log_listener.stop()
+        self.devnull.close()
+
+    def save(self, path):
+        report = {
+            'version': __version__,
+            'python': platform.python_version(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'results': self.results
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+
+    @staticmethod
+    def _load_results(path):
+        try:
+            with open(path, 'r') as f:
+                return OrderedDict(json.load(f)['results'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise RuntimeError(f'*** Invalid benchmark results {path}: {e} ***')
+
+    def load(self, path):
+        # results of a previous run, e.g. to compare them with a baseline without running the benchmarks
+        self.results = SelfBenchmark._load_results(path)
+
+    def compare(self, path, threshold=DEFAULT_THRESHOLD):
+        # 2 if any result is slower than the baseline by more than threshold
+        baseline = SelfBenchmark._load_results(path)
+        regressions = 0
+        self.logger.info(CSC.highlight(f'{"benchmark":<32} {"baseline":>12} {"current":>12} {"delta":>8}', underline=True))
+        for name, r in self.results.items():
+            b = baseline.get(name)
+            if not b or b.get('unit') != r['unit'] or not b.get('value'):
+                continue
+            delta = (r['value'] - b['value']) / b['value']
+            line = f'{name:<32} {b["value"]:>12.3f} {r["value"]:>12.3f} {delta * 100:>+7.1f}%'
+            if delta > threshold:
+                regressions += 1
+                self.logger.error(CSC.highlight(line, 'red', bold=True))
+            else:
+                self.logger.info(line)
+        if regressions:
+            self.logger.error(CSC.highlight(f'{regressions} benchmark{"" if regressions == 1 else "s"} slower than the baseline by more than {threshold * 100:g}%', 'red', bold=True))
+            return 2
+        return 0
 
 
 class CSCCursesMenu(object):
@@ -595,6 +1856,184 @@ class CSC(object):
     HASH_SHA384_VALUE = '6NFCC0/0HD8SGG2JSpnhxKpoHaecRwB+na3s2eywSC7h4iRRDnSEB4wCifNDlrnD'  # echo abc | sha384sum | xxd -r -p | base64 | tr -d '\r\n'
     HASH_SHA512_VALUE = 'TyhdDAzHcobYcxeYt6riY54oJw1BZvQNdpy73KUjBxTYSEg9Nk4vOf5suQg8FSKbOaM2FevG1XYF98Q/aQZznQ=='  # echo abc | sha512sum | xxd -r -p | base64 | tr -d '\r\n'
 
+    # signAlgo → single digest (and signAlgoParams) used by the signHash load tests
+    SIGN_ALGO_DIGESTS = OrderedDict([
+        (ALGO_SHA1_WITH_RSA_ENC, { 'name': 'sha1', 'hash': HASH_SHA1_VALUE }),
+        (ALGO_SHA224_WITH_RSA_ENC, { 'name': 'sha224', 'hash': HASH_SHA224_VALUE }),
+        (ALGO_SHA256_WITH_RSA_ENC, { 'name': 'sha256', 'hash': HASH_SHA256_VALUE }),
+        (ALGO_SHA384_WITH_RSA_ENC, { 'name': 'sha384', 'hash': HASH_SHA384_VALUE }),
+        (ALGO_SHA512_WITH_RSA_ENC, { 'name': 'sha512', 'hash': HASH_SHA512_VALUE }),
+        (ALGO_RSASSA_PSS, { 'name': 'RSASSA-PSS', 'hash': HASH_SHA256_VALUE, 'signAlgoParams': 'MDmgDzANBglghkgBZQMEAgEFAKEcMBoGCSqGSIb3DQEBCDANBglghkgBZQMEAgEFAKIDAgEgowMCAQE=' })
+    ])
+
+    # expected results (exp_result) of the test cases: constants, compiled once into validation plans
+    EXP_INFO_EN = [
+        { 'condition': 'not in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'lang': 'en-US' } }
+    ]
+    EXP_INFO_IT = [
+        { 'condition': 'not in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'lang': 'it-IT' } }
+    ]
+    EXP_LOGIN = [
+        { 'condition': 'in', 'arg': [ 'access_token' ] },
+        { 'condition': 'not in', 'arg': [ 'refresh_token', 'error' ] }
+    ]
+    EXP_LOGIN_REMEMBER_ME = [
+        { 'condition': 'in', 'arg': [ 'access_token', 'refresh_token' ] },
+        { 'condition': 'not in', 'arg': [ 'error' ] }
+    ]
+    # maxResults → rules
+    EXP_LIST_MAX_RESULTS = { n: [
+        { 'condition': 'in', 'arg': [ 'credentialIDs' ] },
+        { 'condition': 'not in', 'arg': [ 'error' ] },
+        { 'condition': '<', 'arg': { 'credentialIDs': n + 1 } }
+    ] for n in [ 1, 5, 20 ] }
+    EXP_KEY_ALGOS = { 'condition': 'eq', 'arg': { 'key>algo': [ ALGO_RSA_ENC, ALGO_SHA1_WITH_RSA_ENC, ALGO_SHA224_WITH_RSA_ENC, ALGO_SHA256_WITH_RSA_ENC, ALGO_SHA384_WITH_RSA_ENC, ALGO_SHA512_WITH_RSA_ENC, ALGO_RSASSA_PSS ] } }
+    EXP_CREDENTIAL_INFO_SINGLE = [
+        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'PIN', 'OTP', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN' ] },
+        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
+        EXP_KEY_ALGOS
+    ]
+    EXP_CREDENTIAL_INFO_NONE = [
+        { 'condition': 'in', 'arg': [ 'cert', 'key>status', 'key>algo', 'key>len' ] },
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo', 'cert>certificates', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN', 'PIN', 'OTP' ] },
+        EXP_KEY_ALGOS
+    ]
+    EXP_CREDENTIAL_INFO_CHAIN = [
+        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo', 'PIN', 'OTP' ] },
+        { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
+        EXP_KEY_ALGOS
+    ]
+    EXP_CREDENTIAL_INFO_CERT_INFO = [
+        { 'condition': 'in', 'arg': [ 'cert>certificates', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN', 'key>status', 'key>algo', 'key>len' ] },
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'PIN', 'OTP' ] },
+        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
+        EXP_KEY_ALGOS
+    ]
+    # explicit authMode → rules
+    EXP_CREDENTIAL_INFO_AUTH_INFO = {
+        True: [
+            { 'condition': 'in', 'arg': [ 'PIN', 'OTP' ] },
+            { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
+            { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo' ] },
+            { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
+            EXP_KEY_ALGOS
+        ],
+        False: [
+            { 'condition': 'not in', 'arg': [ 'PIN', 'OTP' ] },
+            { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
+            { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo' ] },
+            { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
+            EXP_KEY_ALGOS
+        ]
+    }
+    EXP_SEND_OTP = [
+        { 'condition': 'not in', 'arg': [ 'error', 'error_description' ] }
+    ]
+    # valid credential → rules
+    EXP_AUTHORIZE_WRONG_PIN = { is_valid: [
+        { 'condition': 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'error': 'invalid_pin', 'error_description': 'The PIN is invalid' } if is_valid else { 'error': 'invalid_request', 'error_description': 'Invalid certificate status' } }
+    ] for is_valid in [ True, False ] }
+    EXP_AUTHORIZE = { is_valid: [
+        { 'condition': 'in' if is_valid else 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'not in' if is_valid else 'in', 'arg': [ 'error' ] }
+    ] for is_valid in [ True, False ] }
+    EXP_AUTHORIZE_INVALID_PIN = [
+        { 'condition': 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter PIN' } }
+    ]
+    EXP_AUTHORIZE_INVALID_OTP = [
+        { 'condition': 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter OTP' } }
+    ]
+    EXP_AUTHORIZE_WRONG_OTP = { is_valid: [
+        { 'condition': 'in', 'arg': [ 'error' ] },
+        { 'condition': 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'eq', 'arg': { 'error': 'invalid_otp', 'error_description': 'The OTP is invalid' } if is_valid else { 'error': 'invalid_request', 'error_description': 'Invalid certificate status' } }
+    ] for is_valid in [ True, False ] }
+    EXP_EXTEND_WRONG_SAD = [
+        { 'condition': 'not in', 'arg': [ 'SAD' ] },
+        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter SAD' } }
+    ]
+    EXP_EXTEND = [
+        { 'condition': 'in', 'arg': [ 'SAD' ] },
+        { 'condition': 'not in', 'arg': [ 'error' ] }
+    ]
+    # number of signatures → rules
+    EXP_SIGN_HASH = { n: [
+        { 'condition': 'in', 'arg': [ 'signatures' ] },
+        { 'condition': 'not in', 'arg': [ 'error' ] },
+        { 'condition': '=', 'arg': { 'signatures': n } }
+    ] for n in [ 1, 3, 4 ] }
+    EXP_SIGN_HASH_INVALID_DIGEST_LENGTH = [
+        { 'condition': 'in', 'arg': [ 'error' ] },
+        { 'condition': 'eq', 'arg': { 'error_description': 'Invalid digest value length' } },
+        { 'condition': 'not in', 'arg': [ 'signatures' ] }
+    ]
+    EXP_TIMESTAMP = [
+        { 'condition': 'in', 'arg': [ 'timestamp' ] },
+        { 'condition': 'not in', 'arg': [ 'error' ] }
+    ]
+    EXP_ACCESS_DENIED = [
+        { 'condition': 'eq', 'arg': { 'error': 'access_denied', 'error_description': 'The user or Remote Service denied the request.' } }
+    ]
+
+    LOGO_CACHE_FILE_NAME = 'logos.json'
+    SCAN_SNAPSHOT_FILE_NAME = 'scan_snapshots.json'
+    DEFAULT_SNAPSHOT_TTL = 24 * 3600
+    TOKEN_CACHE_FILE_NAME = 'tokens.json'
+    # a cached session is renewed when it expires within this time (s)
+    TOKEN_CACHE_MARGIN = 300
+    DEFAULT_TOKEN_LIFETIME = 3600
+    LOGO_SIGNATURE_LENGTH = 8
+    LOGO_SIGNATURES = {
+        'image/jpeg': b'\xff\xd8\xff',
+        'image/png': b'\x89PNG\r\n\x1a\n'
+    }
+
+    DEFAULT_PAGE_SIZE = 64
+    ADAPTIVE_PAGE_SIZE_LIMITS = (8, 1024)
+
+    # idempotent services whose responses can be reused within a run
+    CACHEABLE_SERVICES = [ 'info', 'credentials/info', 'credentials/list' ]
+    # responses kept by the cache, the least recently used ones are dropped first
+    RESPONSE_CACHE_SIZE = 256
+    # HTTP records kept by a run: the latencies of the summary cover the last ones, the counters every exchange
+    MAX_HTTP_RECORDS = 10000
+
+    # id() of an exp_result constant → (exp_result, compiled validation plan)
+    _expectation_plans = {}
+
+    DEFAULT_POOL_CONNECTIONS = 4
+    DEFAULT_POOL_MAXSIZE = 8
+
+    # connect and read timeouts (s), the read timeout depends on the service
+    DEFAULT_CONNECT_TIMEOUT = 5.0
+    DEFAULT_READ_TIMEOUT = 30.0
+    SERVICE_READ_TIMEOUTS = {
+        'info': 10.0,
+        'credentials/list': 20.0,
+        'credentials/info': 10.0,
+        'signatures/signHash': 60.0,
+        'signatures/timestamp': 20.0
+    }
+    LOGO_TIMEOUT = (DEFAULT_CONNECT_TIMEOUT, 10.0)
+
+    # idempotent services are retried after connection errors, timeouts and these status codes,
+    # waiting a random time up to base * 2^attempt (capped) between two attempts
+    IDEMPOTENT_SERVICES = [ 'info', 'credentials/list', 'credentials/info', 'signatures/timestamp' ]
+    RETRY_STATUS_CODES = [ 502, 503, 504 ]
+    DEFAULT_RETRIES = 2
+    RETRY_BACKOFF_BASE = 0.2
+    RETRY_BACKOFF_CAP = 5.0
+
     env_IDs = [
         'produzione'
     ]
@@ -627,6 +2066,7 @@ class CSC(object):
     ])
 
     env_URLs = {
+        'mock': 'mock://localhost/csc/v0',
         'produzione': 'https://services.time4mind.com/csc/v0'
     }
 
@@ -663,143 +2103,380 @@ class CSC(object):
             + f'{CSC.highlight("Version:", bold=True)} {__version__}\n' \
             + f'{CSC.highlight("Author:", bold=True)} {__author__}'
 
-    def _generic_test(self, cfg):
-        tests = cfg['tests']
-        response = []
-        for i in range(0, len(tests), 1):
-            t = tests[i]
-            h = {} if 'headers' not in t else t['headers']
-            h['Content-Type'] = 'application/json'
-            if 'input' not in t or t['input'] is None:
-                r = requests.get(self.service_URLs[cfg['service']], headers=h, verify=False, json=t['input'])
+    @staticmethod
+    def _build_http_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True):
+        # pool_connections → number of per-host pools kept, pool_maxsize → connections kept alive per host
+        session = requests.Session()
+        adapter = timed_http_adapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        return session
+
+    def _service_request(self, service, method='POST', test_name=None, use_cache=True, **kwargs):
+        if not use_cache or self.response_cache is None or service not in CSC.CACHEABLE_SERVICES:
+            return self._send_service_request(service, method, test_name, **kwargs)
+        # idempotent services: identical requests (same payload and token) are sent once per run,
+        # concurrent duplicates wait for the request already in flight. Only successful responses
+        # are kept for the next requests, up to RESPONSE_CACHE_SIZE of them
+        key = (service, method, json.dumps(kwargs.get('json'), sort_keys=True), (kwargs.get('headers') or {}).get('Authorization'))
+        with self.response_cache_lock:
+            future = self.response_cache.get(key)
+            hit = future is not None
+            if hit:
+                self.response_cache.move_to_end(key)
             else:
-                r = requests.post(self.service_URLs[cfg['service']], headers=h, verify=False, json=t['input'])
-            if r.text is None or str(r.text) == '':
-                j = {}
+                future = self.response_cache[key] = concurrent_futures.Future()
+                if len(self.response_cache) > CSC.RESPONSE_CACHE_SIZE:
+                    self.response_cache.popitem(last=False)
+            stats = self.response_cache_stats.setdefault(service, { 'hits': 0, 'misses': 0 })
+            stats['hits' if hit else 'misses'] += 1
+        if hit:
+            return future.result()
+        try:
+            r = self._send_service_request(service, method, test_name, **kwargs)
+        except BaseException as e:
+            with self.response_cache_lock:
+                self.response_cache.pop(key, None)
+            future.set_exception(e)
+            raise
+        if not 200 <= r.status_code < 300:
+            with self.response_cache_lock:
+                self.response_cache.pop(key, None)
+        future.set_result(r)
+        return r
+
+    def _send_service_request(self, service, method, test_name=None, **kwargs):
+        # every exchange is recorded: connect and TLS times are collected by the timed connections
+        # of the current thread, TTFB is the time from the end of the handshake until the response
+        # headers have been parsed.
+        # Only the last attempt of a retried request is recorded: the failed attempts and the
+        # backoff waits are accounted as retry time
+        if self.cassette is not None and self.cassette.replaying:
+            return self._replay_service_request(service, method, test_name, **kwargs)
+        url = self.service_URLs[service]
+        breaker = CircuitBreaker.for_host(urlsplit(url).netloc)
+        retries = self.retries if service in CSC.IDEMPOTENT_SERVICES else 0
+        timeout = (self.connect_timeout, self.read_timeout or CSC.SERVICE_READ_TIMEOUTS.get(service, CSC.DEFAULT_READ_TIMEOUT))
+        t_first = time.perf_counter()
+        attempt = 0
+        last_status = None
+        while True:
+            http_timing.reset()
+            record = { 'service': service, 'test': test_name, 'method': method, 'status': None, 'request_size': 0, 'response_size': 0 }
+            if not breaker.allow():
+                if attempt > 0:
+                    # the failed attempts are accounted even if the retry is never sent
+                    record['status'] = last_status
+                    self._add_record(record, time.perf_counter(), t_first, attempt)
+                self._set_error_level(3)
+                raise ServiceUnavailable(f'*** Circuit open for {breaker.host}: {service} request not sent ***')
+            t0 = time.perf_counter()
+            try:
+                r = self.http_session.request(method, url, verify=False, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                transient = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                breaker.record(not transient)
+                last_status = None
+                if not transient or attempt == retries:
+                    self._add_record(record, t0, t_first, attempt)
+                    if self.cassette is not None:
+                        self.cassette.record(self.context, service, method, kwargs, record['total'], error=e)
+                    self._set_error_level(3)
+                    raise ServiceUnavailable(f'*** {service} request failed: {e} ***') from e
             else:
-                try:
-                    j = r.json()
-                except ValueError:
-                    self.logger.error(f'[ {CSC.highlight("KO", "red", bold=True)} ] {cfg["service"]} {t["name"] if "name" in t else "test " + str(i + 1)}: cannot parse json response')
-                    return []  # TODO should not return??
-            check = t['exp_result']
+                breaker.record(r.status_code < 500)
+                last_status = r.status_code
+                if attempt == retries or r.status_code not in CSC.RETRY_STATUS_CODES:
+                    record['status'] = r.status_code
+                    record['request_size'] = len(r.request.body or b'')
+                    record['response_size'] = len(r.content)
+                    record['ttfb'] = max(0.0, r.elapsed.total_seconds() - http_timing.connect - http_timing.tls)
+                    self._add_record(record, t0, t_first, attempt)
+                    if self.cassette is not None:
+                        self.cassette.record(self.context, service, method, kwargs, record['total'], r=r)
+                    return r
+                r.close()
+            time.sleep(random.uniform(0, min(CSC.RETRY_BACKOFF_CAP, CSC.RETRY_BACKOFF_BASE * 2 ** attempt)))
+            attempt += 1
+
+    def _replay_service_request(self, service, method, test_name=None, **kwargs):
+        # the recorded response, after the recorded latency with --replay-latency
+        http_timing.reset()
+        record = { 'service': service, 'test': test_name, 'method': method, 'status': None, 'request_size': 0, 'response_size': 0 }
+        t0 = time.perf_counter()
+        try:
+            r = self.cassette.play(self.context, service, method, self.service_URLs[service], kwargs)
+        except requests.exceptions.RequestException as e:
+            self._add_record(record, t0, t0, 0)
+            self._set_error_level(3)
+            raise ServiceUnavailable(f'*** {service} request failed: {e} ***') from e
+        record['status'] = r.status_code
+        record['request_size'] = len(r.request.body or b'')
+        record['response_size'] = len(r.content)
+        record['ttfb'] = r.elapsed.total_seconds()
+        self._add_record(record, t0, t0, 0)
+        return r
+
+    def _add_record(self, record, t0, t_first, retries):
+        record['total'] = time.perf_counter() - t0
+        record['connect'] = http_timing.connect
+        record['tls'] = http_timing.tls
+        record['retries'] = retries
+        record.setdefault('ttfb', record['total'])
+        self.http_records.append(record)
+        with self.response_cache_lock:
+            totals = self.http_totals.setdefault(record['service'], { 'requests': 0, 'failed': 0, 'request_bytes': 0, 'response_bytes': 0 })
+            totals['requests'] += 1
+            totals['failed'] += record['status'] is None or record['status'] >= 500
+            totals['request_bytes'] += record['request_size']
+            totals['response_bytes'] += record['response_size']
+            if retries > 0:
+                stats = self.retry_stats.setdefault(record['service'], { 'requests': 0, 'retries': 0, 'time': 0.0 })
+                stats['requests'] += 1
+                stats['retries'] += retries
+                stats['time'] += t0 - t_first
+
+    def get_request_count(self):
+        return sum([ t['requests'] for t in self.http_totals.values() ])
+
+    def get_timing_summary(self):
+        services = OrderedDict()
+        for rec in self.http_records:
+            services.setdefault(rec['service'], []).append(rec)
+        summary = OrderedDict()
+        for service, records in services.items():
+            total = sorted([ rec['total'] for rec in records ])
+            summary[service] = dict(self.http_totals[service])
+            summary[service].update({
+                'connect_avg': sum([ rec['connect'] for rec in records ]) / len(records),
+                'tls_avg': sum([ rec['tls'] for rec in records ]) / len(records),
+                'ttfb_p50': CSC._percentile(sorted([ rec['ttfb'] for rec in records ]), 50),
+                'total_p50': CSC._percentile(total, 50),
+                'total_p90': CSC._percentile(total, 90),
+                'total_p99': CSC._percentile(total, 99),
+                'total_max': total[-1]
+            })
+        return summary
 
-            def _traverse_json(root, path):
-                if not isinstance(root, dict) or not isinstance(path, str):
-                    return None
-                if '>' in path:
-                    for k in path.split('>'):
-                        if k in root:
-                            root = root[k]
-                        else:
-                            return None
-                    return root
-                return root[path] if path in root else None
-
-            def _in_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for a in c['arg']:
-                    if not _traverse_json(j, a):
-                        return True
-                return False
+    def _write_timing_report(self, summary):
+        if not self.timing_report:
+            return
+        try:
+            with open(self.timing_report, 'w') as f:
+                json.dump({ 'summary': summary, 'cache': self.response_cache_stats, 'retries': self.retry_stats, 'records': list(self.http_records) }, f, indent=4)
+        except Exception as e:
+            self.logger.error('{} {}'.format(CSC.highlight(f'An error occurred while writing the timing report {self.timing_report}', 'red', bold=True), e))
 
-            def _not_in_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for a in c['arg']:
-                    if _traverse_json(j, a) is not None:
-                        return True
-                return False
+    def print_run_summary(self):
+        if len(self.http_records) == 0:
+            self._write_timing_report({})
+            return
+        summary = self.get_timing_summary()
+        # only the last exchanges are kept
+        window = f', last {len(self.http_records)} exchanges' if len(self.http_records) == self.http_records.maxlen else ''
+        self.logger.info(CSC.highlight(f'\nPer-service latency summary (ms{window})', bold=True))
+        self.logger.info(CSC.highlight(f'{"service":<30} {"reqs":>5} {"fail":>5} {"connect":>8} {"tls":>8} {"ttfb p50":>9} {"p50":>8} {"p90":>8} {"p99":>8} {"max":>8}', underline=True))
+        for service, s in summary.items():
+            self.logger.info(f'{service:<30} {s["requests"]:>5} {s["failed"]:>5} {s["connect_avg"] * 1000:>8.1f} {s["tls_avg"] * 1000:>8.1f} {s["ttfb_p50"] * 1000:>9.1f} ' + ' '.join([ f'{s[k] * 1000:>8.1f}' for k in [ 'total_p50', 'total_p90', 'total_p99', 'total_max' ] ]))
+        if len(self.retry_stats) > 0:
+            self.logger.info(CSC.highlight('\nRetries (not included in the latencies above)', bold=True))
+            self.logger.info(CSC.highlight(f'{"service":<30} {"reqs":>5} {"retries":>7} {"time ms":>9}', underline=True))
+            for service, s in self.retry_stats.items():
+                self.logger.info(f'{service:<30} {s["requests"]:>5} {s["retries"]:>7} {s["time"] * 1000:>9.1f}')
+        for breaker in CircuitBreaker.for_urls(self.service_URLs.values()):
+            if breaker.stats['opened'] > 0:
+                self.logger.warn(CSC.highlight(f'Circuit breaker of {breaker.host} opened {breaker.stats["opened"]} time{"" if breaker.stats["opened"] == 1 else "s"}, {breaker.stats["rejected"]} request{"" if breaker.stats["rejected"] == 1 else "s"} not sent', 'yellow', bold=True))
+        if len(self.response_cache_stats) > 0:
+            self.logger.info(CSC.highlight('\nResponse cache', bold=True))
+            self.logger.info(CSC.highlight(f'{"service":<30} {"hits":>5} {"miss":>5} {"hit %":>6}', underline=True))
+            for service, s in self.response_cache_stats.items():
+                self.logger.info(f'{service:<30} {s["hits"]:>5} {s["misses"]:>5} {100 * s["hits"] / (s["hits"] + s["misses"]):>6.1f}')
+        self._write_timing_report(summary)
+
+    def _send_test_case(self, service, t, test_name=None):
+        # test cases hit the wire, but for the idempotent duplicates of a previous request flagged 'cache': True
+        h = {} if 'headers' not in t else t['headers']
+        h['Content-Type'] = 'application/json'
+        try:
+            if 'input' not in t or t['input'] is None:
+                return self._service_request(service, 'GET', test_name=test_name, use_cache=t.get('cache', False), headers=h, json=t.get('input'))
+            return self._service_request(service, 'POST', test_name=test_name, use_cache=t.get('cache', False), headers=h, json=t['input'])
+        except ServiceUnavailable as e:
+            # reported as a KO of the test case
+            return e
+
+    def _test_case_responses(self, cfg):
+        # yield the responses in declaration order: in concurrent mode every run of consecutive
+        # independent tests is sent in parallel, tests flagged as `sequential' (e.g. the ones
+        # changing the server state) act as barriers and are sent alone
+        tests = cfg['tests']
+        i = 0
+        while i < len(tests):
+            if not self.concurrent_tests or tests[i].get('sequential', False):
+                yield self._send_test_case(cfg['service'], tests[i], tests[i].get('name', f'test {i + 1}'))
+                i += 1
+                continue
+            j = i
+            while j < len(tests) and not tests[j].get('sequential', False):
+                j += 1
+            futures = [ self._get_test_executor().submit(self._send_test_case, cfg['service'], t, t.get('name', f'test {k + 1}')) for k, t in enumerate(tests[i:j], i) ]
+            for f in futures:
+                yield f.result()
+            i = j
+
+    def _get_test_executor(self):
+        if self.test_executor is None:
+            self.test_executor = concurrent_futures.ThreadPoolExecutor(max_workers=self.test_workers, thread_name_prefix='csc-test')
+        return self.test_executor
 
-            def _equal_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for key in c['arg']:
-                    pattern = c['arg'][key]
-                    node = _traverse_json(j, key)
+    @staticmethod
+    def _traverse_json(root, keys):
+        # keys: path already split on '>', e.g. ('cert', 'certificates')
+        for k in keys:
+            if not isinstance(root, dict) or k not in root:
+                return None
+            root = root[k]
+        return root
+
+    @staticmethod
+    def _compile_rule(c):
+        # return a callback receiving the json response and returning True when the rule is NOT satisfied
+        condition = c.get('condition')
+        arg = c.get('arg')
+        if condition not in [ 'in', 'not in', 'eq', 'not eq', '<', '=', '>' ]:
+            raise ValueError(f'unknown condition {condition!r}')
+        if arg is None:
+            return lambda j: False
+        if condition in [ 'in', 'not in' ]:
+            if not isinstance(arg, list) or not all(isinstance(a, str) for a in arg):
+                raise ValueError(f'condition {condition!r} expects a list of paths')
+        elif not isinstance(arg, dict):
+            raise ValueError(f'condition {condition!r} expects a dictionary')
+        traverse = CSC._traverse_json
+
+        if condition == 'in':
+            paths = [ tuple(a.split('>')) for a in arg ]
+            return lambda j: any(not traverse(j, p) for p in paths)
+        if condition == 'not in':
+            paths = [ tuple(a.split('>')) for a in arg ]
+            return lambda j: any(traverse(j, p) is not None for p in paths)
+        if condition == 'not eq':
+            items = list(arg.items())
+            return lambda j: isinstance(j, dict) and any(k in j and j[k] == v for k, v in items)
+        if condition == 'eq':
+            rules = []
+            for key, pattern in arg.items():
+                if not isinstance(pattern, (list, str)):
+                    raise ValueError(f'condition {condition!r} expects a regex or a list for {key!r}')
+                try:
+                    rules.append((tuple(key.split('>')), pattern if isinstance(pattern, list) else re.compile(pattern)))
+                except re.error as e:
+                    raise ValueError(f'invalid regex {pattern!r} for {key!r}: {e}')
+
+            def _equal_callback(j):
+                for path, pattern in rules:
+                    node = traverse(j, path)
                     if not node:
                         return True
                     if isinstance(pattern, list):
-                        if not isinstance(node, list) or len([ x for x in zip(pattern, node) if x[0] != x[1] ]) > 0:
+                        if not isinstance(node, list) or any(x != y for x, y in zip(pattern, node)):
                             return True
-                    elif not re.match(pattern, node):
-                        return True
-                return False
-
-            def _not_equal_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for key in c['arg']:
-                    if key in j and j[key] == c['arg'][key]:
-                        return True
-                return False
-
-            def _len_lesser_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for key in c['arg']:
-                    node = _traverse_json(j, key)
-                    if not isinstance(node, list) or len(node) >= c['arg'][key]:
+                    elif not isinstance(node, str) or not pattern.match(node):
                         return True
                 return False
+            return _equal_callback
+
+        if not all(isinstance(v, int) for v in arg.values()):
+            raise ValueError(f'condition {condition!r} expects integer lengths')
+        compare = {
+            '<': lambda size, limit: size < limit,
+            '=': lambda size, limit: size == limit,
+            '>': lambda size, limit: size > limit
+        }[condition]
+        lengths = [ (tuple(k.split('>')), v) for k, v in arg.items() ]
+
+        def _len_callback(j):
+            for path, limit in lengths:
+                node = traverse(j, path)
+                if not isinstance(node, list) or not compare(len(node), limit):
+                    return True
+            return False
+        return _len_callback
 
-            def _len_eq_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for key in c['arg']:
-                    node = _traverse_json(j, key)
-                    if not isinstance(node, list) or len(node) != c['arg'][key]:
-                        return True
-                return False
+    @staticmethod
+    def compile_expectations(exp_result):
+        # exp_result is a constant (EXP_*): its validation plan is compiled at its first use and
+        # cached by id(), the constant is kept with its plan so that its id cannot be reused
+        entry = CSC._expectation_plans.get(id(exp_result))
+        if entry is None:
+            entry = CSC._expectation_plans[id(exp_result)] = (exp_result, tuple([ (c, CSC._compile_rule(c)) for c in exp_result ]))
+        return entry[1]
 
-            def _len_greater_callback():
-                if 'arg' not in c or c['arg'] is None:
-                    return False
-                for key in c['arg']:
-                    node = _traverse_json(j, key)
-                    if not isinstance(node, list) or len(node) <= c['arg'][key]:
-                        return True
-                return False
+    @staticmethod
+    def validate_response(plan, j):
+        # return the first rule not satisfied by the response or None
+        for c, failed in plan:
+            if failed(j):
+                return c
+        return None
 
-            for c in check:
+    def _generic_test(self, cfg):
+        tests = cfg['tests']
+        plans = []
+        for i, t in enumerate(tests):
+            try:
+                plans.append(CSC.compile_expectations(t['exp_result']))
+            except ValueError as e:
+                self._set_error_level(1)
+                raise RuntimeError(f'*** Invalid expected result rules for {cfg["service"]} {t.get("name", "test " + str(i + 1))}: {e} ***')
+        # --deadline: only the test cases of the current phase are sent, the others get an empty response
+        selected = [ i for i, t in enumerate(tests) if self._phase_selects(t) ]
+        response = [ {} for t in tests ]
+        for k, r in enumerate(self._test_case_responses(cfg if len(selected) == len(tests) else dict(cfg, tests=[ tests[i] for i in selected ]))):
+            i = selected[k]
+            t = tests[i]
+            if isinstance(r, ServiceUnavailable):
+                self._print_KO_msg(cfg['service'], i + 1, t['input'], { 'error': str(r).strip('* ') }, t['name'] if 'name' in t else None, error_level=3)
+                continue
+            if r.text is None or str(r.text) == '':
+                j = {}
+            else:
                 try:
-                    if {
-                        'in': _in_callback,
-                        'not in': _not_in_callback,
-                        'eq': _equal_callback,
-                        'not eq': _not_equal_callback,
-                        '<': _len_lesser_callback,
-                        '=': _len_eq_callback,
-                        '>': _len_greater_callback
-                    }[c['condition']]():
-                        self._print_KO_msg(cfg['service'], i + 1, t['input'], j, t['name'] if 'name' in t else None, error_level=2 if 'err_level' not in t else t['err_level'])
-                        self.logger.error(f'{CSC.highlight(" Expected result rules:", bold=True)} {CSC.highlight(json.dumps(check, indent=4, sort_keys=True), "IndianRed1")}\n\n')
-                        break
-                except Exception as e:
-                    self.logger.error(f'{CSC.highlight("Invalid condition check: " + c["condition"], "yellow", bold=True)} - {type(e).__name__} {e}')
-                    traceback.print_exc()
+                    j = r.json()
+                except ValueError:
+                    self.logger.error(f'[ {CSC.highlight("KO", "red", bold=True)} ] {cfg["service"]} {t["name"] if "name" in t else "test " + str(i + 1)}: cannot parse json response')
+                    return []  # TODO should not return??
+            if CSC.validate_response(plans[i], j) is not None:
+                self._print_KO_msg(cfg['service'], i + 1, t['input'], j, t['name'] if 'name' in t else None, error_level=2 if 'err_level' not in t else t['err_level'])
+                self.logger.error('%s %s\n\n', lazy_highlight(' Expected result rules:', bold=True), lazy_json(t['exp_result'], 'IndianRed1'))
             else:
                 self._print_OK_msg(cfg['service'], i + 1, t['name'] if 'name' in t else None)
 
-            response.append(j)
+            response[i] = j
         return response
 
+    def _phase_selects(self, t):
+        # critical phase: the level 3 test cases only, other phase: every other test case
+        if self.phase is None:
+            return True
+        return (t.get('err_level', 2) >= 3) == (self.phase == 'critical')
+
     def info_test(self):
-        r = requests.get(self.service_URLs['info'], verify=False)
+        r = self._service_request('info', 'GET', test_name='info_test')
         j = r.json()
-        self.logger.info(f'{json.dumps(j, indent=4, sort_keys=True)}')
-        if 'logo' in j:
+        self.logger.info('%s', lazy_json(j))
+        if 'logo' in j and self.cassette is not None and self.cassette.replaying:
+            self.logger.info(CSC.highlight('Logo not checked: replaying recorded responses', 'yellow'))
+        elif 'logo' in j:
             # check logo existence
-            rr = requests.get(j['logo'], allow_redirects=False)
-            if rr is None:
-                self.logger.error(f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test failed: {CSC.highlight("info response is empty", color="yellow")}')
-            elif rr.status_code != 200:
-                self.logger.error(f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test failed: {CSC.highlight("status_code " + str(rr.status_code), color="yellow")}')
-            elif rr.headers['Content-Type'] != 'image/png' and rr.headers['Content-Type'] != 'image/jpeg':
-                self.logger.error(f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test failed: {CSC.highlight("content type " + str(rr.headers["Content-Type"]), color="yellow")}')
+            cache = load_json_cache(CSC.LOGO_CACHE_FILE_NAME)
+            s = CSC._check_logo('info', j['logo'], allow_redir=False, session=self.http_session, cache=cache, check_extension=False)
+            if 'KO' in s:
+                self.logger.error(s)
             else:
-                self.logger.info(f'[ {CSC.highlight("OK", color="green", bold=True)} ] Logo test')
+                self.logger.info(s)
+            save_json_cache(CSC.LOGO_CACHE_FILE_NAME, cache)
         else:
             self.logger.error(CSC.highlight('Logo URL not present', color='yellow', bold=True))
         cfg = {
@@ -807,19 +2484,15 @@ class CSC(object):
             'tests': [
                 {
                     'name': 'no arguments',
+                    'cache': True,  # same request as above
                     'input': None,
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'error' ] },
-                        { 'condition': 'eq', 'arg': { 'lang': 'en-US' }, }
-                    ]
+                    'exp_result': CSC.EXP_INFO_EN
                 },
                 {
                     'name': 'IT language',
+                    'cache': False,
                     'input': { 'lang': 'it-IT' },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'error' ] },
-                        { 'condition': 'eq', 'arg': { 'lang': 'it-IT' }, }
-                    ]
+                    'exp_result': CSC.EXP_INFO_IT
                 }
             ]
         }
@@ -839,19 +2512,13 @@ class CSC(object):
                     'name': 'simple login',
                     'headers': { 'Authorization': 'Basic ' + self.credential_encoded },
                     'input': None,
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'access_token' ] },
-                        { 'condition': 'not in', 'arg': [ 'refresh_token', 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_LOGIN
                 },
                 {  # 2
                     'name': 'remember me login',
                     'headers': { 'Authorization': 'Basic ' + self.credential_encoded },
                     'input': { 'rememberMe': True },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'access_token', 'refresh_token' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_LOGIN_REMEMBER_ME
                 }
             ]
         }
@@ -873,7 +2540,7 @@ class CSC(object):
             raise RuntimeError('*** Session key unavailable ***')
         return self.session_key, self.refresh_token
 
-    def list_test(self):
+    def list_test(self, full_listing=True):
         if self.session_key is None:
             raise RuntimeError('*** Session key unavailable ***')
         cfg = {
@@ -881,54 +2548,66 @@ class CSC(object):
             'tests': [
                 {  # 1
                     'name': 'maxResults 1',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'maxResults': 1 },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'credentialIDs' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] },
-                        { 'condition': '<', 'arg': { 'credentialIDs': 2 } }
-                    ]
+                    'exp_result': CSC.EXP_LIST_MAX_RESULTS[1]
                 },
                 {  # 2
                     'name': 'maxResults 5',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'maxResults': 5 },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'credentialIDs' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] },
-                        { 'condition': '<', 'arg': { 'credentialIDs': 6 } }
-                    ]
+                    'exp_result': CSC.EXP_LIST_MAX_RESULTS[5]
                 },
                 {  # 3
                     'name': 'maxResults 20',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'maxResults': 20 },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'credentialIDs' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] },
-                        { 'condition': '<', 'arg': { 'credentialIDs': 21 } }
-                    ]
+                    'exp_result': CSC.EXP_LIST_MAX_RESULTS[20]
                 }
             ]
         }
         self._generic_test(cfg)
-        self.credential_IDs = self.list_utility(64)
-        if len(self.credential_IDs) > 1:
-            chunk_size = len(self.credential_IDs) // 5 + 1
-            if len(self.list_utility(chunk_size, 5)) == len(self.credential_IDs):
+        if full_listing:
+            self.credential_IDs = self.list_utility(self.page_size)
+            self.pagination_test()
+        return self.credential_IDs
+
+    def pagination_test(self, count=None):
+        # count: number of credentials of a listing that did not keep their IDs
+        count = len(self.credential_IDs) if count is None else count
+        if count > 1:
+            chunk_size = count // 5 + 1
+            if self.list_utility(chunk_size, 5, count_only=True) == count:
                 self.logger.info(f'[ {CSC.highlight("OK", "green", bold=True)} ] credentials/list - pagination test')
             else:
                 self.logger.error(f'[ {CSC.highlight("KO", "red", bold=True)} ] credentials/list - pagination test')
-        return self.credential_IDs
 
-    def list_utility(self, max_results=1, iterations=-1):
-        if self.session_key is None:
-            raise RuntimeError('*** Session key unavailable ***')
-        credentials_ids = []
-        payload = { 'maxResults': max_results }
+    def list_utility(self, max_results=1, iterations=-1, count_only=False):
+        ids = self.iter_credential_ids(max_results, iterations, progress=self.progress)
+        credentials_ids = sum(1 for c in ids) if count_only else list(ids)
+        if self.progress:
+            flush_logs()
+            sys.stdout.write("\r\033[K")
+            sys.stdout.flush()
+        return credentials_ids
+
+    def _credential_pages(self, max_results=1, iterations=-1, progress=False):
+        # max_results='auto': the page size is tuned on the measured listing throughput
+        tuner = PageSizeTuner(CSC.DEFAULT_PAGE_SIZE, *CSC.ADAPTIVE_PAGE_SIZE_LIMITS) if max_results == 'auto' else None
+        page_token = None
         dots_num = 0
+        self.listing_complete = False
         while iterations != 0:
-            r = requests.post(self.service_URLs['credentials/list'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+            payload = { 'maxResults': max_results if tuner is None else tuner.size }
+            if page_token is not None:
+                payload['pageToken'] = page_token
+            t0 = time.perf_counter()
+            # every page token is used once: pages are not cached
+            r = self._service_request('credentials/list', 'POST', test_name='list_utility', use_cache=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+            latency = time.perf_counter() - t0
             if r.text is not None and str(r.text) != '':
                 try:
                     j = r.json()
@@ -939,19 +2618,69 @@ class CSC(object):
                 self.logger.error(CSC.highlight('Invalid response while iterating credentials list', 'red', bold=True))
                 break
             if 'error' in j:
+                if r.status_code in [ 401, 403 ] or j['error'] in [ 'invalid_token', 'access_denied' ]:
+                    # the session is not related to the page size: the listing stops
+                    self.logger.error(CSC.highlight(f'Session rejected while iterating credentials list: {j.get("error_description", j["error"])}', 'red', bold=True))
+                    break
+                # the page size may exceed the server limit: retry the same page with a smaller one
+                if tuner is not None and tuner.rejected(payload['maxResults']):
+                    continue
                 break
             elif 'credentialIDs' in j and isinstance(j['credentialIDs'], list):
-                credentials_ids.extend(j['credentialIDs'])
+                if tuner is not None:
+                    tuner.update(payload['maxResults'], len(j['credentialIDs']), latency, len(r.content), 'nextPageToken' in j)
+                yield j['credentialIDs']
             if 'nextPageToken' not in j:
+                self.listing_complete = True
                 break
-            payload['pageToken'] = j['nextPageToken']
+            page_token = j['nextPageToken']
             iterations = iterations if iterations < 0 else iterations - 1
-            sys.stdout.write("\r\033[K" if dots_num is 5 else ". ")
-            dots_num = (dots_num + 1) % 6
-            sys.stdout.flush()
-        sys.stdout.write("\r\033[K")
-        sys.stdout.flush()
-        return credentials_ids
+            self.listing_complete = iterations == 0
+            if progress:
+                flush_logs()
+                sys.stdout.write("\r\033[K" if dots_num == 5 else ". ")
+                dots_num = (dots_num + 1) % 6
+                sys.stdout.flush()
+        if tuner is not None and tuner.best_size is not None:
+            self.logger.info(CSC.highlight(f'credentials/list adaptive page size: {tuner.best_size} ({tuner.best_rate:.0f} IDs/s, {tuner.bytes_per_id:.0f} bytes/ID) \u2192  use --page-size {tuner.best_size} for this virtual host', 'DeepSkyBlue2'))
+
+    def iter_credential_ids(self, max_results=1, iterations=-1, progress=False, prefetch=2):
+        # yield the credential IDs as soon as each page arrives: the next pages are fetched by a
+        # background thread, at most `prefetch' pages are kept in memory
+        if self.session_key is None:
+            raise RuntimeError('*** Session key unavailable ***')
+        pages = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def _put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _fetch():
+            try:
+                for page in self._credential_pages(max_results, iterations, progress):
+                    if not _put(page):
+                        return
+            except Exception as e:
+                _put(e)
+            _put(None)
+
+        threading.Thread(target=_fetch, name='csc-list', daemon=True).start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield from page
+        finally:
+            stop.set()
 
     def credentials_info_test(self, credential_id=None, auth_mode='explicit'):
         if self.session_key is None:
@@ -962,102 +2691,73 @@ class CSC(object):
             'tests': [
                 {  # 1
                     'name': 'credential_id only',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'PIN', 'OTP', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN' ] },
-                        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_SINGLE
                 },
                 {  # 2
                     'name': 'certificates none',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'none' },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo', 'cert>certificates', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN', 'PIN', 'OTP' ] },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_NONE
                 },
                 {  # 3
                     'name': 'certificates single',
+                    'cache': True,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'single' },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN', 'PIN', 'OTP' ] },
-                        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_SINGLE
                 },
                 {  # 4
                     'name': 'certificates chain',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'chain' },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo', 'PIN', 'OTP' ] },
-                        { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_CHAIN
                 },
                 {  # 5
                     'name': 'certInfo',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'single', 'certInfo': True },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'PIN', 'OTP' ] },
-                        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_CERT_INFO
                 },
                 {  # 6
                     'name': 'no certInfo',
+                    'cache': True,  # same request as # 3
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'single' },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'PIN', 'OTP', 'cert>validFrom', 'cert>validTo', 'cert>subjectDN', 'cert>serialNumber', 'cert>issuerDN' ] },
-                        { 'condition': '=', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_SINGLE
                 },
                 {  # 7
                     'name': 'authInfo',
+                    'cache': False,
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'input': { 'credentialID': credential_id, 'certificates': 'chain', 'authInfo': True },
-                    'exp_result': [
-                        { 'condition': 'in' if auth_mode == 'explicit' else 'not in', 'arg': [ 'PIN', 'OTP' ] },
-                        { 'condition': 'in', 'arg': [ 'cert>certificates', 'key>status', 'key>algo', 'key>len' ] },
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description', 'cert>validFrom', 'cert>validTo' ] },
-                        { 'condition': '>', 'arg': { 'cert>certificates': 1 } },
-                        { 'condition': 'eq', 'arg': { 'key>algo': [ "1.2.840.113549.1.1.1", "1.2.840.113549.1.1.5", "1.2.840.113549.1.1.14", "1.2.840.113549.1.1.11", "1.2.840.113549.1.1.12", "1.2.840.113549.1.1.13", "1.2.840.113549.1.1.10" ] } }
-                    ]
+                    'exp_result': CSC.EXP_CREDENTIAL_INFO_AUTH_INFO[auth_mode == 'explicit']
                 }
             ]
         }
         self._generic_test(cfg)
 
-    def get_credential_info(self, credential_id=None, print_details=False, certificates='none'):
-        if credential_id is None:
-            raise RuntimeError('*** Credential ID unavailable ***')
-        if self.session_key is None:
-            self.session_key = self._get_session_key()
-
+    def _fetch_credential_info(self, credential_id, certificates='none', use_cache=True):
         payload = {
             'certificates': certificates,
             'authInfo': True,
             'certInfo': True,
             'credentialID': credential_id
         }
-        r = requests.post(self.service_URLs['credentials/info'], headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, verify=False, json=payload)
+        r = self._service_request('credentials/info', 'POST', test_name='get_credential_info', use_cache=use_cache, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
         j = r.json()
         if 'error' in j:
             self._set_error_level(1 if 'Session is invalid' else 3)
             raise RuntimeError(f'*** Unable to get credential info {"" if "error_description" not in j else (": " + j["error_description"])} ***')
+        return j
+
+    @staticmethod
+    def _parse_credential_info(j):
         is_valid = otp_presence = pin_presence = False
         otp_type = auth_mode = None
         pin_presence = 'PIN' in j and 'presence' in j['PIN'] and j['PIN']['presence'] == 'true'
@@ -1073,12 +2773,24 @@ class CSC(object):
         if 'key' in j and 'algo' in j['key']:
             key_algo = j['key']['algo']
 
-        if print_details:
-            self.logger.debug(f'{CSC.highlight("Credential ID", bold=True)} {CSC.highlight(credential_id, "SeaGreen2" if is_valid else "red", bold=True)}')
-            self.logger.debug(json.dumps(j, indent=4, sort_keys=True))
-
         return is_valid, auth_mode, pin_presence, otp_presence, otp_type, key_algo
 
+    def _print_credential_details(self, credential_id, j, cached=False):
+        is_valid = CSC._parse_credential_info(j)[0]
+        self.logger.debug(f'{CSC.highlight("Credential ID", bold=True)} {CSC.highlight(credential_id, "SeaGreen2" if is_valid else "red", bold=True)}{" (cached)" if cached else ""}')
+        self.logger.debug('%s', lazy_json(j))
+
+    def get_credential_info(self, credential_id=None, print_details=False, certificates='none'):
+        if credential_id is None:
+            raise RuntimeError('*** Credential ID unavailable ***')
+        if self.session_key is None:
+            self.session_key = self._get_session_key()
+
+        j = self._fetch_credential_info(credential_id, certificates)
+        if print_details:
+            self._print_credential_details(credential_id, j)
+        return CSC._parse_credential_info(j)
+
     def send_otp_test(self, credential_id=None):
         if self.session_key is None:
             raise RuntimeError('*** Session key unavailable ***')
@@ -1090,12 +2802,11 @@ class CSC(object):
             'tests': [
                 {  # 1
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
+                    'sequential': True,
                     'input': {
                         'credentialID': credential_id
                     },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'error', 'error_description' ] }
-                    ]
+                    'exp_result': CSC.EXP_SEND_OTP
                 }
             ]
         }
@@ -1112,7 +2823,7 @@ class CSC(object):
                 payload = {
                     'credentialID': credential_id
                 }
-                r = requests.post(self.service_URLs['credentials/sendOTP'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+                r = self._service_request('credentials/sendOTP', 'POST', test_name='send_otp', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
                 if r.text != '' and 'error' in r.json():
                     self._set_error_level(3)
                     j = r.json()
@@ -1122,6 +2833,17 @@ class CSC(object):
             self.logger.error(f'{CSC.highlight("An error occurred while sending an OTP for credential {credential_id}", "red", bold=True)} - {type(e).__name__} {e}')
         self.single_revoke(noout=True)
 
+    def _get_pin(self):
+        if self.DEFAULT_PIN is None:
+            pin = prompt_password(CSC.highlight('Please enter the PIN value [press ENTER to abort]: ', bold=True))
+            if pin == '':
+                raise RuntimeError('*** Unable to perform Authorize tests: PIN is empty ***')
+            return pin
+        elif self.quiet:
+            return self.DEFAULT_PIN
+        tmp = prompt_password(CSC.highlight('Confirm or change the default PIN [' + self.DEFAULT_PIN + ']: ', bold=True))
+        return tmp if tmp != '' else self.DEFAULT_PIN
+
     def authorize_test(self, credential_id=None, auth_mode='explicit', pin_presence=True, otp_presence=True, otp_type='online', num_signatures=20, is_valid=True):
         if self.session_key is None:
             raise RuntimeError('*** Session key unavailable ***')
@@ -1131,52 +2853,34 @@ class CSC(object):
             return
         pin = None
         if auth_mode == 'explicit' and pin_presence:
-            if self.DEFAULT_PIN is None:
-                pin = getpass.getpass(CSC.highlight('Please enter the PIN value [press ENTER to abort]: ', bold=True))
-                if pin == '':
-                    raise RuntimeError('*** Unable to perform Authorize tests: PIN is empty ***')
-            elif self.quiet:
-                pin = self.DEFAULT_PIN
-            else:
-                tmp = getpass.getpass(CSC.highlight('Confirm or change the default PIN [' + self.DEFAULT_PIN + ']: ', bold=True))
-                pin = tmp if tmp != '' else self.DEFAULT_PIN
+            pin = self._get_pin()
 
         if auth_mode == 'explicit' and otp_presence:
             if self.quiet:
                 raise RuntimeError('*** Unable to perform Authorize tests in quiet mode: OTP is required ***')
-            otp = input(CSC.highlight('Please enter the OTP value [press ENTER to abort]: ', bold=True))
+            otp = prompt(CSC.highlight('Please enter the OTP value [press ENTER to abort]: ', bold=True))
             if otp == '':
                 raise RuntimeError('*** Unable to perform Authorize tests: OTP is empty ***')
 
-        # TODO fix this
-        if is_valid:
-            wrong_pin_test_error = 'invalid_pin'
-            wrong_pin_test_error_description = 'The PIN is invalid'
-        else:
-            wrong_pin_test_error = 'invalid_request'
-            wrong_pin_test_error_description = 'Invalid certificate status'
-
         cfg = {
             'service': 'credentials/authorize',
             'tests': [
                 {  # 2 - wrong PIN
                     'name': 'wrong PIN',
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
+                    'sequential': True,  # could lock the PIN
                     'input': {
                         'credentialID': credential_id,
                         'numSignatures': num_signatures,
                         'PIN': '>>0',
                         'OTP': None
                     },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'in', 'arg': [ 'error' ] },
-                        { 'condition': 'eq', 'arg': { 'error': wrong_pin_test_error, 'error_description': wrong_pin_test_error_description } },
-                    ]
+                    'exp_result': CSC.EXP_AUTHORIZE_WRONG_PIN[is_valid]
                 },
                 {  # 3
                     'name': f'valid authorize request for {num_signatures} signatures',
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
+                    'sequential': True,
                     'err_level': 3,
                     'input': {
                         'credentialID': credential_id,
@@ -1184,10 +2888,7 @@ class CSC(object):
                         'PIN': None,
                         'OTP': None
                     },
-                    'exp_result': [
-                        { 'condition': 'in' if is_valid else 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'not in' if is_valid else 'in', 'arg': [ 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_AUTHORIZE[is_valid]
                 },
                 {  # 4
                     'name': 'invalid PIN format',
@@ -1198,11 +2899,7 @@ class CSC(object):
                         'PIN': 12345678,
                         'OTP': None
                     },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'in', 'arg': [ 'error' ] },
-                        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter PIN' } },
-                    ]
+                    'exp_result': CSC.EXP_AUTHORIZE_INVALID_PIN
                 },
                 {  # 5
                     'name': 'invalid OTP format',
@@ -1213,11 +2910,7 @@ class CSC(object):
                         'PIN': None,
                         'OTP': 12345678
                     },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'in', 'arg': [ 'error' ] },
-                        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter OTP' } },
-                    ]
+                    'exp_result': CSC.EXP_AUTHORIZE_INVALID_OTP
                 }
             ]
         }
@@ -1230,17 +2923,14 @@ class CSC(object):
                 tmp = {  # 1 - wrong OTP
                     'name': 'wrong OTP',
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
+                    'sequential': True,  # could lock the OTP
                     'input': {
                         'OTP': '>>0',
                         'credentialID': credential_id,
                         'numSignatures': num_signatures,
                         'PIN': None
                     },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'error' ] },
-                        { 'condition': 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'eq', 'arg': { 'error': 'invalid_otp' if is_valid else 'invalid_request', 'error_description': 'The OTP is invalid' if is_valid else 'Invalid certificate status' } }
-                    ]
+                    'exp_result': CSC.EXP_AUTHORIZE_WRONG_OTP[is_valid]
                 }
                 cfg['tests'].insert(0, tmp)
             else:
@@ -1253,6 +2943,7 @@ class CSC(object):
                 if 'PIN' in i['input'] and i['input']['PIN'] is None:
                     i['input']['PIN'] = pin
 
+        previous_sad = self.SAD
         self.SAD = None
         try:
             r = self._generic_test(cfg)
@@ -1264,6 +2955,10 @@ class CSC(object):
                 self.SAD = r[i]['SAD']
                 break
         else:
+            if self.phase == 'other':
+                # the valid request has been sent in the critical phase
+                self.SAD = previous_sad
+                return self.SAD
             if is_valid:
                 self._set_error_level(3)
             raise RuntimeError('*** SAD unavailable ***')
@@ -1286,23 +2981,18 @@ class CSC(object):
                         'SAD': 'xxx',
                         'credentialID': credential_id
                     },
-                    'exp_result': [
-                        { 'condition': 'not in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'eq', 'arg': { 'error': 'invalid_request', 'error_description': 'Invalid parameter SAD' } }
-                    ]
+                    'exp_result': CSC.EXP_EXTEND_WRONG_SAD
                 },
                 {  # 2
                     'name': 'valid request',
                     'headers': { 'Authorization': 'Bearer ' + self.session_key },
                     'err_level': 3,
+                    'sequential': True,
                     'input': {
                         'SAD': sad,
                         'credentialID': credential_id
                     },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'SAD' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_EXTEND
                 }
             ]
         }
@@ -1312,6 +3002,8 @@ class CSC(object):
                 self.SAD = r[i]['SAD']
                 break
         else:
+            if self.phase == 'other':
+                return sad
             self._set_error_level(3)
             raise RuntimeError('*** Cannot extend SAD validity ***')
         return self.SAD
@@ -1325,10 +3017,6 @@ class CSC(object):
             'service': 'signatures/signHash',
             'tests': []
         }
-        result_success = [
-            { 'condition': 'in', 'arg': [ 'signatures' ] },
-            { 'condition': 'not in', 'arg': [ 'error' ] }
-        ]
         invalid_digest_length_req = {
             # Erroneous request - invalid digest value length
             'name': 'Invalid digest length',
@@ -1340,17 +3028,11 @@ class CSC(object):
                 ],
                 'credentialID': credential_id
             },
-            'exp_result': [
-                { 'condition': 'in', 'arg': [ 'error' ] },
-                { 'condition': 'eq', 'arg': { 'error_description': 'Invalid digest value length' } },
-                { 'condition': 'not in', 'arg': [ 'signatures' ] }
-            ]
+            'exp_result': CSC.EXP_SIGN_HASH_INVALID_DIGEST_LENGTH
         }
         invalid_digest_length_performed = False
 
         if CSC.ALGO_SHA1_WITH_RSA_ENC in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 4 } })
             base_request = {
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
                 'err_level': 3,
@@ -1363,15 +3045,17 @@ class CSC(object):
                         CSC.HASH_SHA1_VALUE
                     ],
                     'credentialID': credential_id
-                },
-                'exp_result': r
+                }
             }
+            # the rules are constants: they are not copied
             tmp = copy.deepcopy(base_request)
             tmp['name'] = 'sha1 with signAlgo'
+            tmp['exp_result'] = CSC.EXP_SIGN_HASH[4]
             tmp['input']['signAlgo'] = CSC.ALGO_SHA1_WITH_RSA_ENC
             cfg['tests'].append(tmp)
             tmp = copy.deepcopy(base_request)
             tmp['name'] = 'sha1 with generic signAlgo and hashAlgo'
+            tmp['exp_result'] = CSC.EXP_SIGN_HASH[4]
             tmp['input']['signAlgo'] = CSC.ALGO_RSA_ENC
             tmp['input']['hashAlgo'] = CSC.HASH_SHA1_OID
             cfg['tests'].append(tmp)
@@ -1383,8 +3067,6 @@ class CSC(object):
                 invalid_digest_length_performed = True
 
         if CSC.ALGO_SHA224_WITH_RSA_ENC in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 1 } })
             cfg['tests'].append({
                 'name': 'sha224 with signAlgo',
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
@@ -1395,7 +3077,7 @@ class CSC(object):
                     'hash': [ CSC.HASH_SHA224_VALUE ],
                     'credentialID': credential_id
                 },
-                'exp_result': r
+                'exp_result': CSC.EXP_SIGN_HASH[1]
             })
             if not invalid_digest_length_performed:
                 # Invalid digest value length
@@ -1404,8 +3086,6 @@ class CSC(object):
                 invalid_digest_length_performed = True
 
         if CSC.ALGO_SHA256_WITH_RSA_ENC in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 1 } })
             cfg['tests'].append({
                 'name': 'sha256 with signAlgo',
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
@@ -1416,7 +3096,7 @@ class CSC(object):
                     'hash': [ CSC.HASH_SHA256_VALUE ],
                     'credentialID': credential_id
                 },
-                'exp_result': r
+                'exp_result': CSC.EXP_SIGN_HASH[1]
             })
             if not invalid_digest_length_performed:
                 # Invalid digest value length
@@ -1425,8 +3105,6 @@ class CSC(object):
                 invalid_digest_length_performed = True
 
         if CSC.ALGO_SHA384_WITH_RSA_ENC in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 3 } })
             cfg['tests'].append({
                 'name': 'sha384 with signAlgo',
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
@@ -1441,7 +3119,7 @@ class CSC(object):
                     ],
                     'credentialID': credential_id
                 },
-                'exp_result': r
+                'exp_result': CSC.EXP_SIGN_HASH[3]
             })
             if not invalid_digest_length_performed:
                 # Invalid digest value length
@@ -1450,8 +3128,6 @@ class CSC(object):
                 invalid_digest_length_performed = True
 
         if CSC.ALGO_SHA512_WITH_RSA_ENC in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 1 } })
             cfg['tests'].append({
                 'name': 'sha512 with signAlgo',
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
@@ -1462,7 +3138,7 @@ class CSC(object):
                     'hash': [ CSC.HASH_SHA512_VALUE ],
                     'credentialID': credential_id
                 },
-                'exp_result': r
+                'exp_result': CSC.EXP_SIGN_HASH[1]
             })
             if not invalid_digest_length_performed:
                 # Invalid digest value length
@@ -1471,8 +3147,6 @@ class CSC(object):
                 invalid_digest_length_performed = True
 
         if CSC.ALGO_RSASSA_PSS in key_algo:
-            r = copy.deepcopy(result_success)
-            r.append({ 'condition': '=', 'arg': { 'signatures': 3 } })
             cfg['tests'].append({
                 'name': 'RSASSA-PSS with signAlgo',
                 'headers': { 'Authorization': 'Bearer ' + self.session_key },
@@ -1488,7 +3162,7 @@ class CSC(object):
                     ],
                     'credentialID': credential_id
                 },
-                'exp_result': r
+                'exp_result': CSC.EXP_SIGN_HASH[3]
             })
             if not invalid_digest_length_performed:
                 # Invalid digest value length
@@ -1514,10 +3188,7 @@ class CSC(object):
                         'hash': 'uB28DAYaAZ+74aWHm30uDgeVB18=',
                         'hashAlgo': '1.3.14.3.2.26'
                     },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'timestamp' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_TIMESTAMP
                 },
                 {  # 2
                     'name': 'with nonce',
@@ -1527,10 +3198,7 @@ class CSC(object):
                         'hashAlgo': '1.3.14.3.2.26',
                         'nonce': '654654131635468464'
                     },
-                    'exp_result': [
-                        { 'condition': 'in', 'arg': [ 'timestamp' ] },
-                        { 'condition': 'not in', 'arg': [ 'error' ] }
-                    ]
+                    'exp_result': CSC.EXP_TIMESTAMP
                 }
             ]
         }
@@ -1544,9 +3212,7 @@ class CSC(object):
                     'input': {
                         'key': 'value'
                     },
-                    'exp_result': [
-                        { 'condition': 'eq', 'arg': { 'error': 'access_denied', 'error_description': 'The user or Remote Service denied the request.' } }
-                    ]
+                    'exp_result': CSC.EXP_ACCESS_DENIED
                 }
             ]
         }
@@ -1558,12 +3224,12 @@ class CSC(object):
             'token': s
         }
         self.logger.info(CSC.highlight(f'Revoking token {s} ...', bold=True))
-        requests.post(self.service_URLs['auth/revoke'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+        self._service_request('auth/revoke', 'POST', test_name='revoke test 1', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
         payload = {
             'hash': 'uB28DAYaAZ+74aWHm30uDgeVB18=',
             'hashAlgo': '1.3.14.3.2.26'
         }
-        r = requests.post(self.service_URLs['signatures/timestamp'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+        r = self._service_request('signatures/timestamp', 'POST', test_name='revoke test 1', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
         j = r.json()
         if 'error' in j:
             self._print_OK_msg('auth/revoke', 1)
@@ -1574,7 +3240,7 @@ class CSC(object):
             payload = {
                 'rememberMe': True
             }
-            r = requests.post(self.service_URLs['auth/login'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
+            r = self._service_request('auth/login', 'POST', test_name='revoke test 2', headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
             j = r.json()
             if 'error' not in j:
                 sessionKey = j['access_token']
@@ -1583,12 +3249,12 @@ class CSC(object):
                     'token': refreshToken
                 }
                 self.logger.info(CSC.highlight(f'Revoking token {refreshToken} ...', bold=True))
-                r = requests.post(self.service_URLs['auth/revoke'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
+                r = self._service_request('auth/revoke', 'POST', test_name='revoke test 2', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
                 if r.text == '' or 'error' not in r.json():
                     payload = {
                         'refresh_token': refreshToken
                     }
-                    r = requests.post(self.service_URLs['auth/login'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
+                    r = self._service_request('auth/login', 'POST', test_name='revoke test 2', headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
                     j = r.json()
                     if 'error' in j:
                         self._print_OK_msg('auth/revoke', 2)
@@ -1596,7 +3262,7 @@ class CSC(object):
                         self._print_KO_msg('Revoke', 2, payload, j)
                 else:
                     self._set_error_level(2)
-                    self.logger.error(CSC.highlight(json.dumps(r.json(), indent=4, sort_keys=True), 'red'))
+                    self.logger.error('%s', lazy_json(r.json(), 'red'))
                     self.logger.error(CSC.highlight('*** Unable to perfom revoke test 2: revoke failed', 'red'))
             else:
                 self._set_error_level(2)
@@ -1606,7 +3272,7 @@ class CSC(object):
             payload = {
                 'rememberMe': True
             }
-            r = requests.post(self.service_URLs['auth/login'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
+            r = self._service_request('auth/login', 'POST', test_name='revoke test 3', headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
             j = r.json()
             if 'error' not in j:
                 sessionKey = j['access_token']
@@ -1616,12 +3282,12 @@ class CSC(object):
                     'token_type_hint': 'refresh_token'
                 }
                 self.logger.info(CSC.highlight(f'Revoking token {refreshToken} ...', bold=True))
-                r = requests.post(self.service_URLs['auth/revoke'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
+                r = self._service_request('auth/revoke', 'POST', test_name='revoke test 3', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
                 if r.text == '' or 'error' not in r.json():
                     payload = {
                         'refresh_token': refreshToken
                     }
-                    r = requests.post(self.service_URLs['auth/login'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
+                    r = self._service_request('auth/login', 'POST', test_name='revoke test 3', headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json=payload)
                     j = r.json()
                     if 'error' in j:
                         self._print_OK_msg('auth/revoke', 3)
@@ -1630,14 +3296,14 @@ class CSC(object):
                 else:
                     self._set_error_level(2)
                     j = r.json()
-                    self.logger.error(CSC.highlight(json.dumps(j, indent=4, sort_keys=True), 'red'))
+                    self.logger.error('%s', lazy_json(j, 'red'))
                     self.logger.error(CSC.highlight('*** Unable to perfom revoke test 3: revoke failed', 'red'))
             else:
                 self._set_error_level(2)
                 self.logger.error(CSC.highlight('*** Unable to perfom revoke test 3: login failed', 'red'))
         # REVOKE Test 4
         if self.credential_encoded is not None:
-            r = requests.get(self.service_URLs['auth/login'], verify=False, headers={'Authorization': 'Basic ' + self.credential_encoded})
+            r = self._service_request('auth/login', 'GET', test_name='revoke test 4', headers={'Authorization': 'Basic ' + self.credential_encoded})
             j = r.json()
             if 'error' not in j:
                 sessionKey = j['access_token']
@@ -1646,9 +3312,9 @@ class CSC(object):
                     'token_type_hint': 'access_token'
                 }
                 self.logger.info(CSC.highlight(f'Revoking token {sessionKey} ...', bold=True))
-                r = requests.post(self.service_URLs['auth/revoke'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
+                r = self._service_request('auth/revoke', 'POST', test_name='revoke test 4', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + sessionKey }, json=payload)
                 if r.text == '' or 'error' not in r.json():
-                    r = requests.get(self.service_URLs['credentials/list'], verify=False, headers={'Authorization': 'Bearer ' + sessionKey})
+                    r = self._service_request('credentials/list', 'GET', test_name='revoke test 4', use_cache=False, headers={'Authorization': 'Bearer ' + sessionKey})
                     j = r.json()
                     if 'error' in j:
                         self._print_OK_msg('auth/revoke', 4)
@@ -1657,7 +3323,7 @@ class CSC(object):
                 else:
                     self._set_error_level(2)
                     j = r.json()
-                    self.logger.error(CSC.highlight(json.dumps(j, indent=4, sort_keys=True), 'red'))
+                    self.logger.error('%s', lazy_json(j, 'red'))
                     self.logger.error(CSC.highlight('*** Unable to perfom revoke test 4: revoke failed', 'red'))
             else:
                 self._set_error_level(2)
@@ -1673,57 +3339,29 @@ class CSC(object):
         }
         if not noout:
             self.logger.info(CSC.highlight(f'Revoking token {token} ...', bold=True))
-        r = requests.post(self.service_URLs['auth/revoke'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
+        if self.cached_session and token in (self.session_key, self.refresh_token):
+            self._forget_session()
+        r = self._service_request('auth/revoke', 'POST', test_name='single_revoke', headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }, json=payload)
         if r.text != '' and 'error' in r.json():
             self._set_error_level(2)
             j = r.json()
-            self.logger.error('{}  {}'.format(CSC.highlight(' \u2190', bold=True), CSC.highlight(json.dumps(j, indent=4, sort_keys=True), 'red')))
+            self.logger.error('%s  %s', lazy_highlight(' \u2190', bold=True), lazy_json(j, 'red'))
             self.logger.error(CSC.highlight(f'*** Unable to revoke sessionKey {token} ***', 'red', bold=True))
 
     def _print_OK_msg(self, service, testNum, test_name=None):
-        self.logger.info(f'[ {CSC.highlight("OK", "green", bold=True)} ] {service} {"test " + str(testNum) if test_name is None else "- " + test_name}')
+        self.test_counts['OK'] += 1
+        self.logger.info('[ %s ] %s %s', lazy_highlight('OK', 'green', bold=True), service, 'test ' + str(testNum) if test_name is None else '- ' + test_name)
 
     def _print_KO_msg(self, service, testNum, request, response, test_name=None, error_level=2):
         self._set_error_level(error_level)
-        self.logger.error(f'[ {CSC.highlight("KO", "red", bold=True)} ] {service} {"test " + str(testNum) if test_name is None else "- " + test_name}')
-        self.logger.error('{} {}'.format(CSC.highlight(u' \u2192 ', bold=True), CSC.highlight(json.dumps(request, indent=4, sort_keys=True), 'IndianRed1')))
-        self.logger.error('{} {}'.format(CSC.highlight(u' \u2190 ', bold=True), CSC.highlight(json.dumps(response, indent=4, sort_keys=True), 'IndianRed1')))
+        self.test_counts['KO'] += 1
+        self.logger.error('[ %s ] %s %s', lazy_highlight('KO', 'red', bold=True), service, 'test ' + str(testNum) if test_name is None else '- ' + test_name)
+        self.logger.error('%s %s', lazy_highlight(' \u2192 ', bold=True), lazy_json(request, 'IndianRed1'))
+        self.logger.error('%s %s', lazy_highlight(' \u2190 ', bold=True), lazy_json(response, 'IndianRed1'))
 
     @staticmethod
-    @logger_style_artist
     def highlight(msg, color='white', bold=False, underline=False):
-        if not sys.stdout.isatty():
-            return msg
-        attr = []
-        if bold:
-            attr.append('1')
-        if underline:
-            attr.append('4')
-        if not bold and not underline:
-            attr.append('0')
-        try:
-            color = {
-                'black': '90',
-                'red': '91',
-                'green': '92',
-                'yellow': '93',
-                'blue': '94',
-                'purple': '95',
-                'cyan': '96',
-                'white': '97',
-                'DeepPink1': [ '38', '5', '198' ],
-                'DeepSkyBlue2': [ '38', '5', '38'  ],
-                'IndianRed1': [ '38', '5', '203' ],
-                'SeaGreen2': [ '38', '5', '83'  ]
-            }[color]
-        except KeyError:
-            # default to white
-            color = '97'
-        if isinstance(color, str):
-            attr.append(color)
-        else:
-            attr.extend(color)
-        return '\x1b[%sm%s\x1b[0m' % (';'.join(attr), msg)
+        return _priv_attr.style.render(msg, color, bold, underline)
 
     def _sig_handler(self, signal, frame):
         signame = {
@@ -1731,31 +3369,109 @@ class CSC(object):
             15: 'SIGTERM'
         }[signal]
         print(CSC.highlight('\n*** ' + signame + ' detected ***', 'yellow', bold=True), file=sys.stderr)
-        if self.SAD is not None and self.SAD != '':
-            self.single_revoke(self.SAD)
-        if self.session_key is not None and self.session_key != '':
-            do_revoke = 'y' if self.quiet else input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+        # the SADs of the running workers and the ones kept for the second phase of --deadline too
+        with self.workers_lock:
+            sads = [ self.SAD ] + [ w.SAD for w in self.workers ] + list(self.phase_SADs.values())
+        for sad in OrderedDict.fromkeys(sads):
+            if sad is not None and sad != '':
+                self.single_revoke(sad)
+        if self.session_key is not None and self.session_key != '' and not self.cached_session:
+            do_revoke = 'y' if self.quiet else prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
             while not re.match('[yYnN]', do_revoke):
                 if do_revoke == '':
                     do_revoke = 'y'
                     break
-                do_revoke = input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+                do_revoke = prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
             if re.match('[yY]', do_revoke):
                 self.single_revoke(self.session_key)
         sys.exit(1 if self.error_level < 1 else self.error_level)
 
     def _ask_and_revoke(self, session_key=None):
-        do_revoke = 'y' if self.quiet else input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+        if self.cached_session and (session_key is None or session_key == self.session_key):
+            self.logger.info(CSC.highlight('Session key kept in the token cache', 'yellow'))
+            return
+        do_revoke = 'y' if self.quiet else prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
         while not re.match('[yYnN]', do_revoke):
             if do_revoke == '':
                 do_revoke = 'y'
                 break
-            do_revoke = input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+            do_revoke = prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
         if re.match('[yY]', do_revoke):
             self.single_revoke(self.session_key if session_key is None else session_key)
 
+    def _token_cache_key(self):
+        return f'{self.context}|{self.username}'
+
+    def _update_token_cache(self, entry):
+        # read-modify-write of the whole file, shared by the workers of a run
+        with _priv_attr.token_cache_lock:
+            tokens = load_json_cache(CSC.TOKEN_CACHE_FILE_NAME)
+            if entry is None:
+                if tokens.pop(self._token_cache_key(), None) is None:
+                    return
+            else:
+                tokens[self._token_cache_key()] = entry
+            save_json_cache(CSC.TOKEN_CACHE_FILE_NAME, tokens)
+
+    def _cache_session(self, access_token, refresh_token=None, expires_in=None):
+        self.session_key = access_token
+        self.refresh_token = refresh_token
+        self.cached_session = True
+        self._update_token_cache({
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'expires_at': time.time() + (expires_in or CSC.DEFAULT_TOKEN_LIFETIME)
+        })
+
+    def _forget_session(self):
+        self.cached_session = False
+        self._update_token_cache(None)
+
+    def _session_accepted(self, access_token):
+        # the cached token may have been revoked or forgotten by a restarted service: checked with a
+        # single-item listing, only an authentication error rejects it
+        try:
+            r = self._service_request('credentials/list', 'POST', test_name='token_cache', use_cache=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + access_token }, json={ 'maxResults': 1 })
+            j = r.json() if r.text else {}
+        except (requests.exceptions.RequestException, RuntimeError, ValueError):
+            return True
+        return not (r.status_code == 401 or j.get('error') == 'invalid_token')
+
+    def _cached_session(self):
+        # session of a previous run (--token-cache): reused until it is about to expire or rejected by
+        # the service, then renewed with its refresh token
+        if not self.token_cache or self.username is None:
+            return False
+        with _priv_attr.token_cache_lock:
+            entry = load_json_cache(CSC.TOKEN_CACHE_FILE_NAME).get(self._token_cache_key())
+        if entry is None:
+            return False
+        if time.time() < entry['expires_at'] - CSC.TOKEN_CACHE_MARGIN:
+            if self._session_accepted(entry['access_token']):
+                self.session_key = entry['access_token']
+                self.refresh_token = entry.get('refresh_token')
+                self.cached_session = True
+                self.logger.info(CSC.highlight('Using cached session key', 'yellow'))
+                return True
+            self.logger.info(CSC.highlight('Cached session key rejected by the service', 'yellow'))
+        if entry.get('refresh_token'):
+            try:
+                r = self._service_request('auth/login', 'POST', test_name='token_cache', headers={ 'Content-Type': 'application/json' }, json={ 'refresh_token': entry['refresh_token'] })
+                j = r.json()
+                if 'error' not in j and 'access_token' in j:
+                    self._cache_session(j['access_token'], j.get('refresh_token', entry['refresh_token']), j.get('expires_in'))
+                    self.logger.info(CSC.highlight('Cached session key refreshed', 'yellow'))
+                    return True
+            except Exception:
+                pass
+        self._forget_session()
+        return False
+
     def _get_session_key(self):
-        r = requests.post(self.service_URLs['auth/login'], verify=False, headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded })
+        if self._cached_session():
+            return self.session_key
+        # a refresh token is requested for the token cache
+        r = self._service_request('auth/login', 'POST', test_name='_get_session_key', headers={ 'Content-Type': 'application/json', 'Authorization': 'Basic ' + self.credential_encoded }, json={ 'rememberMe': True } if self.token_cache else None)
         if r.text is not None and str(r.text) != '':
             try:
                 j = r.json()
@@ -1770,13 +3486,15 @@ class CSC(object):
 
         if 'error' in j or 'access_token' not in j:
             self.logger.error(CSC.highlight('An error occurred during login', 'red', bold=True))
-            self.logger.error(CSC.highlight(json.dumps(r.json(), indent=4, sort_keys=True), 'red'))
+            self.logger.error('%s', lazy_json(r.json(), 'red'))
             self._set_error_level(1)
             return
+        if self.token_cache:
+            self._cache_session(j['access_token'], j.get('refresh_token'), j.get('expires_in'))
         return j['access_token']
 
     def _credential_test_core(self, credential_id, login_executed=False):
-        is_valid, auth_mode, pin_presence, otp_presence, otp_type, key_algo = self.get_credential_info(credential_id=credential_id, print_details=True)
+        is_valid, auth_mode, pin_presence, otp_presence, otp_type, key_algo = self.get_credential_info(credential_id=credential_id, print_details=self.phase != 'other')
         self.credentials_info_test(credential_id, auth_mode)
         if is_valid or self.test_invalid_credentials:
             abort_signature = False
@@ -1784,13 +3502,13 @@ class CSC(object):
                 if not login_executed or __user__[1].lower() not in self.username:
                     r = 'n' if self.quiet else ''
                     while r != 'y' and r != 'n':
-                        r = input(CSC.highlight(f'WARNING! Username could not belong to {" ".join(__user__)}. Continue? [y/n] ', 'yellow', bold=True))
+                        r = prompt(CSC.highlight(f'WARNING! Username could not belong to {" ".join(__user__)}. Continue? [y/n] ', 'yellow', bold=True))
                     if r != 'y':
                         abort_signature = True
             if not abort_signature and auth_mode == 'implicit':
                 r = 'n' if self.quiet else ''
                 while r != 'y' and r != 'n':
-                    r = input(CSC.highlight('Implicit authorization, do you want to continue? [y/n] ', 'yellow', bold=True))
+                    r = prompt(CSC.highlight('Implicit authorization, do you want to continue? [y/n] ', 'yellow', bold=True))
                 if r != 'y':
                     abort_signature = True
             elif not self.quiet and not abort_signature and auth_mode in [ 'explicit', 'oauth2code' ] and otp_presence and otp_type == 'online':
@@ -1804,8 +3522,8 @@ class CSC(object):
             self.logger.info(CSC.highlight('*** SKIP: invalid credential ***', 'yellow'))
 
     def check_credential(self, cred_id, ask_revoke=False, login_executed=False):
-        r = requests.get(self.service_URLs['info'], verify=False)
-        self.logger.info(f'{json.dumps(r.json(), indent=4, sort_keys=True)}')
+        r = self._service_request('info', 'GET', test_name='check_credential')
+        self.logger.info('%s', lazy_json(r.json()))
         login_executed = False
         if not self.session_key:
             self.session_key = self._get_session_key()
@@ -1819,118 +3537,599 @@ class CSC(object):
             self.logger.error(CSC.highlight(e, 'yellow', bold=True))
 
         if ask_revoke:
-            do_revoke = 'y' if self.quiet else input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
-            while not re.match('[yYnN]', do_revoke):
-                if do_revoke == '':
-                    do_revoke = 'y'
-                    break
-                do_revoke = input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
-            if re.match('[yY]', do_revoke):
-                self.single_revoke(self.session_key)
+            self._ask_and_revoke()
+
+    def check_credentials(self, cred_ids):
+        if len(cred_ids) < 2 or not self._parallel_jobs_enabled():
+            for i in range(len(cred_ids)):
+                self.check_credential(cred_ids[i], ask_revoke=(i == len(cred_ids) - 1), login_executed=(i > 0))
+            self.print_run_summary()
+            return
+        # a single login shared by every worker
+        if not self.session_key:
+            self.session_key = self._get_session_key()
+            if not self.session_key:
+                return
+            self.logger.info(CSC.highlight('Using session key ' + self.session_key, 'yellow'))
+        self._run_credential_jobs(cred_ids, lambda csc, c: csc.check_credential(c))
+        self._ask_and_revoke()
+        self.print_run_summary()
+
+    def _parallel_jobs_enabled(self):
+        if self.jobs < 2:
+            return False
+        if not self.quiet:
+            # user interactions (PIN, OTP, confirmations) cannot be shared among workers
+            self.logger.warn(CSC.highlight('Parallel credential tests are available in quiet mode only: running sequentially', 'yellow'))
+            self.jobs = 1
+            return False
+        return True
+
+    def _worker_clone(self):
+        # shares the HTTP session, the session key and the (locked) timing records and response cache,
+        # owns SAD, error level, counters, per-run containers and a buffered logger
+        worker = copy.copy(self)
+        worker.logger = logging.Logger(f'{__name__}.worker')
+        worker.logger.setLevel(self.logger.getEffectiveLevel())
+        worker.logger.addHandler(BufferingHandler(sys.maxsize))
+        worker.SAD = None
+        worker.error_level = 0
+        worker.test_counts = { 'OK': 0, 'KO': 0 }
+        worker.credential_IDs = []
+        worker.phase_SADs = {}
+        worker.workers = set()
+        worker.workers_lock = threading.Lock()
+        return worker
+
+    def _run_credential_jobs(self, credential_ids, func):
+        def _job(credential_id):
+            worker = self._worker_clone()
+            # running workers are known to the SIGINT handler, which revokes their SADs
+            with self.workers_lock:
+                self.workers.add(worker)
+            try:
+                func(worker, credential_id)
+            except RuntimeError as e:
+                worker.logger.error(CSC.highlight(e, 'yellow', bold=True))
+            finally:
+                with self.workers_lock:
+                    self.workers.discard(worker)
+            return worker
+
+        def _flush(future):
+            worker = future.result()
+            for record in worker.logger.handlers[0].buffer:
+                self.logger.handle(record)
+            self._set_error_level(worker.error_level)
+            for k, v in worker.test_counts.items():
+                self.test_counts[k] += v
+
+        if self.concurrent_tests:
+            self._get_test_executor()
+        with concurrent_futures.ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='csc-job') as executor:
+            # the output of every credential is flushed as a whole, following the credentials order;
+            # credential_ids may be a generator: at most 2 * jobs credentials are pending at once
+            pending = deque()
+            for c in credential_ids:
+                pending.append(executor.submit(_job, c))
+                while len(pending) > 2 * self.jobs or (len(pending) > 0 and pending[0].done()):
+                    _flush(pending.popleft())
+            while len(pending) > 0:
+                _flush(pending.popleft())
+
+    def _deadline_enabled(self):
+        if self.deadline is None:
+            return False
+        if not self.quiet:
+            # the checks of a credential are split in two phases: its PIN and OTP would be asked twice
+            self.logger.warn(CSC.highlight('The time budget is available in quiet mode only: running every check', 'yellow'))
+            return False
+        return True
+
+    def _deadline_credential(self, credential_id, login_executed):
+        # the SAD of the critical phase is used by the checks of the other phase
+        self.SAD = self.phase_SADs.get(credential_id)
+        try:
+            self._credential_test_core(credential_id, login_executed)
+        finally:
+            self.phase_SADs[credential_id] = self.SAD
+            self.SAD = None
+
+    def deadline_test(self):
+        # global_test within a time budget: the level 3 checks (valid authorize, extend and signHash) of
+        # every credential first, then the other checks while the budget lasts. A check is started only
+        # if the remaining time exceeds the average duration of its kind, the others are reported as skipped
+        end = time.monotonic() + self.deadline
+        durations = {}
+        skipped = []
+
+        def _run(kind, name, func, *args):
+            past = durations.get(kind, [])
+            if end - time.monotonic() <= (sum(past) / len(past) if past else 0):
+                skipped.append((kind, name))
+                return False
+            t0 = time.monotonic()
+            try:
+                self._run_check(func, *args)
+            except RuntimeError as e:
+                self.logger.error(CSC.highlight(e, 'yellow', bold=True))
+            finally:
+                durations.setdefault(kind, []).append(time.monotonic() - t0)
+            return True
+
+        login_executed = False
+        if not self.session_key and not self._cached_session():
+            login_executed = True
+            try:
+                self.login_test()
+            except RuntimeError as e:
+                self.logger.error(CSC.highlight(e, 'red', bold=True))
+                sys.exit(self.error_level)
+            if self.token_cache:
+                self._cache_session(self.session_key, self.refresh_token)
+        self.logger.info(CSC.highlight('Using session key ' + self.session_key, 'yellow'))
+        self.credential_IDs = list(self.iter_credential_ids(self.page_size)) if self.test_credentials else []
+        self.phase_SADs = {}
+
+        self.phase = 'critical'
+        self.logger.info(CSC.highlight(f'Critical checks of {len(self.credential_IDs)} credential{"" if len(self.credential_IDs) == 1 else "s"} (time budget {self.deadline:g} s)', bold=True))
+        critical_done = { c for c in self.credential_IDs if _run('critical', c, self._deadline_credential, c, login_executed) }
+
+        self.phase = 'other'
+        self.logger.info(CSC.highlight(f'\nOther checks ({max(0, end - time.monotonic()):.1f} s left)', bold=True))
+        _run('info', 'info', self.info_test)
+        _run('errors', 'generic errors', self.generic_errors)
+        _run('timestamp', 'timestamp', self.timestamp_test)
+        _run('list', 'credentials/list', self.list_test, False)
+        for c in self.credential_IDs:
+            if c in critical_done:
+                _run('credential', c, self._deadline_credential, c, login_executed)
+            else:
+                skipped.append(('credential', c))
+        if len(self.credential_IDs) > 0:
+            _run('pagination', 'pagination', self.pagination_test)
+        self.phase = None
+
+        if self.cached_session:
+            self.logger.info(CSC.highlight('Session key kept in the token cache: revoke tests skipped', 'yellow'))
+        elif not _run('revoke', 'revoke', self.revoke, self.refresh_token if self.refresh_token is not None else self.session_key):
+            self.single_revoke(self.refresh_token, noout=True)
+
+        if len(skipped) > 0:
+            critical = [ name for kind, name in skipped if kind == 'critical' ]
+            self.logger.warn(CSC.highlight(f'\n{len(skipped)} check{"" if len(skipped) == 1 else "s"} skipped: time budget of {self.deadline:g} s exceeded', 'yellow', bold=True))
+            for kind, name in skipped:
+                label = 'valid authorize, extend and signHash' if kind == 'critical' else 'error message checks' if kind == 'credential' else None
+                self.logger.warn(CSC.highlight(f' - {name}' + (f' ({label})' if label else ''), 'red' if kind == 'critical' else 'yellow'))
+            if len(critical) > 0:
+                # the core signature functionalities have not been verified
+                self._set_error_level(1)
+        self.print_run_summary()
+
+    def _report_unavailable(self, e):
+        # error level 3 is set when the exception is raised
+        self.test_counts['KO'] += 1
+        self.logger.error('[ %s ] %s', lazy_highlight('KO', 'red', bold=True), str(e).strip('* '))
+
+    def _run_check(self, func, *args):
+        # a check whose request got no response is KO and the run goes on: once the circuit of the
+        # host is open, the next checks fail fast
+        try:
+            return func(*args)
+        except ServiceUnavailable as e:
+            self._report_unavailable(e)
 
     def global_test(self):
-        self.info_test()
-        self.generic_errors()
+        if self._deadline_enabled():
+            return self.deadline_test()
+        self._run_check(self.info_test)
+        self._run_check(self.generic_errors)
         login_executed = False
-        if not self.session_key:
+        if not self.session_key and not self._cached_session():
             login_executed = True
             try:
                 self.login_test()
             except RuntimeError as e:
                 self.logger.error(CSC.highlight(e, 'red', bold=True))
                 sys.exit(self.error_level)
+            if self.token_cache:
+                self._cache_session(self.session_key, self.refresh_token)
         self.logger.info(CSC.highlight('Using session key ' + self.session_key, 'yellow'))
-        self.timestamp_test()
-        self.list_test()
-        if self.test_credentials and len(self.credential_IDs) > 0:
-            self.logger.info(CSC.highlight(f'{str(len(self.credential_IDs))} credential{"" if len(self.credential_IDs) == 1 else "s"} found', bold=True))
-            self.logger.info(f'{CSC.highlight("Credentials IDs:", bold=True)} {CSC.highlight(json.dumps(self.credential_IDs, indent=4, sort_keys=True), "DeepSkyBlue2")}')
-            for c in self.credential_IDs:
-                try:
-                    self._credential_test_core(c, login_executed)
-                except RuntimeError as e:
-                    self.logger.error(CSC.highlight(e, 'yellow', bold=True))
-        elif not self.test_credentials:
+        self._run_check(self.timestamp_test)
+        if not self.test_credentials:
+            self._run_check(self.list_test)
             self.logger.warn(CSC.highlight('*** SKIPPING CREDENTIALS TESTS ***', 'yellow'))
         else:
-            self.logger.warn(CSC.highlight('*** No credentials found! ***', 'yellow'))
+            # credentials are tested while the next pages of the list are still loading: their IDs are
+            # not kept, so the number of credentials is only reported once they have all been tested
+            # and the IDs appear in the output of their checks instead of a full list
+            self._run_check(self.list_test, False)
+            count = 0
+
+            def _listed_credentials():
+                nonlocal count
+                try:
+                    for c in self.iter_credential_ids(self.page_size):
+                        count += 1
+                        yield c
+                except ServiceUnavailable as e:
+                    self._report_unavailable(e)
+
+            if self._parallel_jobs_enabled():
+                self._run_credential_jobs(_listed_credentials(), lambda csc, c: csc._run_check(csc._credential_test_core, c, login_executed))
+            else:
+                for c in _listed_credentials():
+                    try:
+                        self._run_check(self._credential_test_core, c, login_executed)
+                    except RuntimeError as e:
+                        self.logger.error(CSC.highlight(e, 'yellow', bold=True))
+            if count > 0:
+                self.logger.info(CSC.highlight(f'{str(count)} credential{"" if count == 1 else "s"} found', bold=True))
+                self._run_check(self.pagination_test, count)
+            else:
+                self.logger.warn(CSC.highlight('*** No credentials found! ***', 'yellow'))
 
-        do_revoke = 'y' if self.quiet else input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+        if self.cached_session:
+            self.logger.info(CSC.highlight('Session key kept in the token cache: revoke tests skipped', 'yellow'))
+            self.print_run_summary()
+            return
+        do_revoke = 'y' if self.quiet else prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
         while not re.match('[yYnN]', do_revoke):
             if do_revoke == '':
                 do_revoke = 'y'
                 break
-            do_revoke = input(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
+            do_revoke = prompt(CSC.highlight('Revoke session key? [Y/n] ', bold=True))
         if re.match('[yY]', do_revoke):
-            self.revoke(self.refresh_token if self.refresh_token is not None else self.session_key)
+            self._run_check(self.revoke, self.refresh_token if self.refresh_token is not None else self.session_key)
+        self.print_run_summary()
+
+    @staticmethod
+    def _credential_status(j):
+        return f'{j.get("cert", {}).get("status")}/{j.get("key", {}).get("status")}'
 
-    def scan(self):
+    def scan(self, incremental=False, ttl=DEFAULT_SNAPSHOT_TTL):
         if not self.session_key:
             self.session_key = self._get_session_key()
             if not self.session_key:
                 return
 
         self.logger.info(CSC.highlight(f'Using session key {self.session_key}', 'yellow'))
-        credentials_ids = self.list_utility(64)
-        if len(credentials_ids) > 0:
-            self.logger.info(CSC.highlight(f'{str(len(credentials_ids))} credential{"" if len(credentials_ids) == 1 else "s"} found', bold=True))
-            self.logger.info(f'{CSC.highlight("Credentials IDs:", bold=True)} {CSC.highlight(json.dumps(credentials_ids, indent=4, sort_keys=True), "DeepSkyBlue2")}')
-            for c in credentials_ids:
+        # incremental scan: the details of a credential are fetched again only if it is new, if its
+        # snapshot is older than the TTL or if its position in the list changed
+        if incremental and self.username is None:
+            self.logger.warn(CSC.highlight('Incremental scan unavailable without an account username: performing a full scan', 'yellow'))
+            incremental = False
+        snapshots = load_json_cache(CSC.SCAN_SNAPSHOT_FILE_NAME) if incremental else {}
+        snapshot_key = f'{self.context}|{self.username}'
+        old_snapshot = snapshots.get(snapshot_key, {})
+        # the snapshot (and its diff) is only kept by an incremental scan: a full scan streams the
+        # credentials without holding their details. Every ID is printed with its details as the
+        # listing goes on, instead of a full list up front
+        snapshot = {}
+        added = []
+        status_changed = []
+        count = 0
+        refreshed = 0
+        reused = 0
+        complete = False
+        now = time.time()
+        try:
+            for position, c in enumerate(self.iter_credential_ids(self.page_size)):
+                count += 1
+                entry = old_snapshot.get(c)
+                if entry is not None and entry['position'] == position and now - entry['fetched'] < ttl:
+                    snapshot[c] = entry
+                    reused += 1
+                    self._print_credential_details(c, entry['info'], cached=True)
+                    continue
                 try:
-                    self.get_credential_info(credential_id=c, print_details=True, certificates='single')
+                    # fetched once per credential: not cached, as the listing
+                    j = self._fetch_credential_info(c, 'single', use_cache=False)
                 except RuntimeError as e:
                     self.logger.error(CSC.highlight(f'An error occurred while getting info for credential {c} - {str(e)}', 'red', bold=True))
+                    if entry is not None:
+                        snapshot[c] = entry
+                    continue
+                self._print_credential_details(c, j)
+                refreshed += 1
+                if not incremental:
+                    continue
+                status = CSC._credential_status(j)
+                snapshot[c] = { 'position': position, 'fetched': now, 'status': status, 'info': j }
+                if entry is None:
+                    added.append(c)
+                elif entry['status'] != status:
+                    status_changed.append((c, entry['status'], status))
+            complete = self.listing_complete
+            if not complete:
+                self._set_error_level(1)
+                self.logger.error(CSC.highlight('Credentials listing interrupted by an error response', 'red', bold=True))
+        except RuntimeError as e:
+            self._set_error_level(1)
+            self.logger.error(CSC.highlight(f'Credentials listing interrupted - {str(e).strip("* ")}', 'red', bold=True))
+        if count > 0:
+            self.logger.info(CSC.highlight(f'{str(count)} credential{"" if count == 1 else "s"} found{"" if complete else " before the listing was interrupted"}', bold=True))
         else:
             self.logger.warn(CSC.highlight('No credentials found', 'red', bold=True))
+        if incremental and not complete:
+            self.logger.warn(CSC.highlight('Incomplete listing: snapshot diff skipped, snapshot not saved', 'yellow'))
+        elif incremental:
+            removed = [ c for c in old_snapshot if c not in snapshot ]
+            self.logger.info(CSC.highlight(f'Snapshot diff: {len(added)} added, {len(removed)} removed, {len(status_changed)} status changed ({refreshed} fetched, {reused} from snapshot)', bold=True))
+            list(map(lambda c: self.logger.info(CSC.highlight(f' + {c}', 'green')), added if len(old_snapshot) > 0 else []))
+            list(map(lambda c: self.logger.info(CSC.highlight(f' - {c}', 'red')), removed))
+            list(map(lambda s: self.logger.info(CSC.highlight(f' ~ {s[0]}: {s[1]} \u2192  {s[2]}', 'yellow')), status_changed))
+            snapshots[snapshot_key] = snapshot
+            save_json_cache(CSC.SCAN_SNAPSHOT_FILE_NAME, snapshots)
+        self._ask_and_revoke()
+        self.print_run_summary()
+
+    def _pin_only_sign_algos(self, credential_id):
+        is_valid, auth_mode, pin_presence, otp_presence, otp_type, key_algo = self.get_credential_info(credential_id)
+        if not is_valid or auth_mode != 'explicit' or not pin_presence or otp_presence:
+            raise RuntimeError(f'*** Credential {credential_id} is not a valid PIN only credential ***')
+        algos = [ a for a in CSC.SIGN_ALGO_DIGESTS if key_algo and a in key_algo ]
+        if len(algos) == 0:
+            raise RuntimeError('*** Unsupported signature algorithms ***')
+        return algos
+
+    def _prepare_bench(self, credential_id, num_signatures):
+        if not self.session_key:
+            self.session_key = self._get_session_key()
+            if not self.session_key:
+                return None, None
+        self.logger.info(CSC.highlight(f'Using session key {self.session_key}', 'yellow'))
+        try:
+            algos = self._pin_only_sign_algos(credential_id)
+            sad_manager = SADManager(self, credential_id, num_signatures)
+        except RuntimeError as e:
+            self._set_error_level(1)
+            self.logger.error(CSC.highlight(e, 'red', bold=True))
+            self._ask_and_revoke()
+            return None, None
+        return algos, sad_manager
+
+    def _close_bench(self, sad_manager):
+        sad_manager.close()
+        s = sad_manager.stats
+        self.logger.info(f'SAD: {s["authorize"]} authorize, {s["extend"]} extendTransaction, {s["waits"]} requests waited {s["wait"] * 1000:.1f} ms for a renewal')
+        if sad_manager.error:
+            self._set_error_level(3)
+            self.logger.error(CSC.highlight(sad_manager.error, 'red', bold=True))
         self._ask_and_revoke()
 
     @staticmethod
-    def _check_logo(env_name, url, allow_redir=True):
+    def _sign_hash_payload(credential_id, algo, batch=1):
+        payload = { 'credentialID': credential_id, 'signAlgo': algo, 'hash': [ CSC.SIGN_ALGO_DIGESTS[algo]['hash'] ] * batch }
+        if 'signAlgoParams' in CSC.SIGN_ALGO_DIGESTS[algo]:
+            payload['signAlgoParams'] = CSC.SIGN_ALGO_DIGESTS[algo]['signAlgoParams']
+        return payload
+
+    def _sign_load(self, sad_manager, payloads, duration, concurrency, rate=None):
+        # drives signHash with the given payloads in round robin, the SAD quota is taken from the manager.
+        # Returns the per payload stats, the elapsed time and the number of scheduled requests which were never sent
+        headers = { 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.session_key }
+        keys = list(payloads)
+        stats = OrderedDict((k, { 'latencies': [], 'errors': 0 }) for k in keys)
+        lock = threading.Lock()
+        scheduled = [ 0 ]
+
+        def _sign(key):
+            try:
+                sad = sad_manager.acquire(len(payloads[key]['hash']))
+            except Exception:
+                return False
+            try:
+                j = self._service_request('signatures/signHash', 'POST', test_name='bench', headers=headers, json=dict(payloads[key], SAD=sad)).json()
+                if 'SAD' in j.get('error_description', ''):
+                    sad_manager.invalidate(sad)
+                return 'error' not in j and isinstance(j.get('signatures'), list) and len(j['signatures']) == len(payloads[key]['hash'])
+            except Exception:
+                return False
+            finally:
+                sad_manager.release(sad)
+
+        def _worker():
+            while not sad_manager.error:
+                with lock:
+                    i = scheduled[0]
+                    scheduled[0] += 1
+                key = keys[i % len(keys)]
+                if rate is None:
+                    # closed loop: a new request as soon as the previous one is completed
+                    t0 = time.perf_counter()
+                    if t0 >= deadline:
+                        return
+                else:
+                    # open loop: latency is measured from the intended send time, so a stalled
+                    # server is charged for the requests queued behind it (coordinated omission).
+                    # Requests scheduled before the deadline are still sent when late, for at most
+                    # another duration: the ones left are reported as missed
+                    t0 = start + i / rate
+                    now = time.perf_counter()
+                    if t0 >= deadline or now >= deadline + duration:
+                        return
+                    if t0 > now:
+                        time.sleep(t0 - now)
+                ok = _sign(key)
+                latency = time.perf_counter() - t0
+                with lock:
+                    if ok:
+                        stats[key]['latencies'].append(latency)
+                    else:
+                        stats[key]['errors'] += 1
+
+        threads = [ threading.Thread(target=_worker, name=f'csc-bench-{n}', daemon=True) for n in range(concurrency) ]
+        start = time.perf_counter()
+        deadline = start + duration
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        unsent = math.ceil(duration * rate) - sum([ len(s['latencies']) + s['errors'] for s in stats.values() ]) if rate is not None else 0
+        return stats, elapsed, unsent
+
+    def bench(self, credential_id, duration=30, concurrency=4, rate=None, num_signatures=1000):
+        algos, sad_manager = self._prepare_bench(credential_id, num_signatures)
+        if not sad_manager:
+            return
+        payloads = OrderedDict((a, CSC._sign_hash_payload(credential_id, a)) for a in algos)
+        mode = 'closed loop' if rate is None else f'open loop at {rate:g} req/s'
+        self.logger.info(CSC.highlight(f'signHash benchmark on credential {credential_id}: {duration:g} s, {mode}, concurrency {concurrency}', bold=True))
+        stats, elapsed, unsent = self._sign_load(sad_manager, payloads, duration, concurrency, rate)
+
+        self._print_bench_report(stats, elapsed)
+        if unsent > 0:
+            self.logger.warn(CSC.highlight(f'Target rate not sustained: {unsent} scheduled requests missed (increase --concurrency)', 'yellow'))
+        if sum([ len(s['latencies']) for s in stats.values() ]) == 0:
+            self._set_error_level(3)
+        self._close_bench(sad_manager)
+
+    def sweep(self, credential_id, max_batch=64, duration=5, concurrency=4, num_signatures=1000):
+        # batches of 1, 2, 4 ... max_batch digests per signHash request for every supported signAlgo
+        if max_batch > num_signatures:
+            self._set_error_level(1)
+            self.logger.error(CSC.highlight(f'*** The batch size ({max_batch}) cannot exceed numSignatures ({num_signatures}) ***', 'red', bold=True))
+            return
+        algos, sad_manager = self._prepare_bench(credential_id, num_signatures)
+        if not sad_manager:
+            return
+        batches = [ 2 ** n for n in range(max_batch.bit_length()) ]
+        if batches[-1] != max_batch:
+            batches.append(max_batch)
+        self.logger.info(CSC.highlight(f'signHash batch sweep on credential {credential_id}: batches {batches}, {duration:g} s per step, concurrency {concurrency}', bold=True))
+        signed = 0
+        for a in algos:
+            results = []
+            for b in batches:
+                stats, elapsed, _ = self._sign_load(sad_manager, { b: CSC._sign_hash_payload(credential_id, a, b) }, duration, concurrency)
+                latencies = sorted(stats[b]['latencies'])
+                signed += len(latencies) * b
+                results.append((b, len(latencies), stats[b]['errors'], len(latencies) * b / elapsed, CSC._percentile(latencies, 50)))
+            self._print_sweep_report(CSC.SIGN_ALGO_DIGESTS[a]['name'], results)
+        if signed == 0:
+            self._set_error_level(3)
+        self._close_bench(sad_manager)
+
+    def _print_sweep_report(self, name, results):
+        # the knee is the first batch size whose signatures per second gain over the previous one is below 10%
+        best = max([ r[3] for r in results ]) or 1
+        knee = None
+        for prev, cur in zip(results, results[1:]):
+            if prev[3] > 0 and cur[3] < prev[3] * 1.1:
+                knee = prev[0]
+                break
+        self.logger.info(CSC.highlight(name, 'DeepSkyBlue2', bold=True))
+        self.logger.info(CSC.highlight(f'{"batch":>6} {"requests":>9} {"errors":>7} {"sig/s":>9} {"p50 ms":>8} {"ms/sig":>8}  {"signatures per second":<30}', underline=True))
+        for batch, ok, errors, sig_s, p50 in results:
+            bar = '#' * round(30 * sig_s / best)
+            line = f'{batch:>6} {ok + errors:>9} {errors:>7} {sig_s:>9.1f} {p50 * 1000:>8.1f} {p50 * 1000 / batch:>8.2f}  {bar:<30}'
+            self.logger.info(CSC.highlight(line, 'yellow') if batch == knee else line)
+        if knee:
+            self.logger.info(CSC.highlight(f'Throughput stops scaling after batch size {knee}', 'yellow'))
+        else:
+            self.logger.info(f'Throughput still scaling at batch size {results[-1][0]}')
+
+    def _print_bench_report(self, stats, elapsed):
+        rows = []
+        for a, s in stats.items():
+            rows.append((CSC.SIGN_ALGO_DIGESTS[a]['name'], s['latencies'], s['errors']))
+        if len(rows) > 1:
+            rows.append(('all', [ x for s in stats.values() for x in s['latencies'] ], sum([ s['errors'] for s in stats.values() ])))
+        self.logger.info(CSC.highlight(f'{"signAlgo":<10} {"requests":>9} {"errors":>7} {"err %":>6} {"sig/s":>8} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8}', underline=True))
+        for name, latencies, errors in rows:
+            latencies = sorted(latencies)
+            total = len(latencies) + errors
+            percentiles = [ CSC._percentile(latencies, p) * 1000 for p in [ 50, 90, 99, 100 ] ]
+            self.logger.info(f'{name:<10} {total:>9} {errors:>7} {(100 * errors / total if total else 0):>6.2f} {len(latencies) / elapsed:>8.1f} ' + ' '.join([ f'{p:>8.1f}' for p in percentiles ]))
+
+    @staticmethod
+    def _percentile(sorted_values, p):
+        # nearest-rank percentile
+        if len(sorted_values) == 0:
+            return 0
+        return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+    @staticmethod
+    def _check_logo(env_name, url, allow_redir=True, session=None, cache=None, check_extension=True):
         p = re.compile("^.+\.([^.]+)$")
         content_types = {
             "jpeg": "image/jpeg",
             "jpg": "image/jpeg",
             "png": "image/png"
         }
+        ko_msg = f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]:'
         try:
             m = p.search(url)
-            r = requests.get(url, allow_redirects=allow_redir)
-            if r is None:
-                return f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]: {CSC.highlight("info response is empty", color="yellow")}'
-            elif r.status_code != 200:
-                return f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]: {CSC.highlight("status_code " + str(r.status_code), color="yellow")}'
-            elif m.group(1) in content_types and r.headers['content-type'] != content_types[m.group(1)]:
-                return f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]: {CSC.highlight("content-type " + r.headers["content-type"], color="yellow")}'
-            elif m.group(1) not in content_types:
-                return f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]: {CSC.highlight("Unable to check content-type " + r.headers["content-type"], color="yellow")}'
+            extension = m.group(1) if m else None
+            # only the file signature is downloaded, a cached ETag/Last-Modified turns the request into a 304 round trip
+            headers = { 'Range': f'bytes=0-{CSC.LOGO_SIGNATURE_LENGTH - 1}' }
+            cached = cache.get(url) if cache is not None else None
+            if cached:
+                if 'etag' in cached:
+                    headers['If-None-Match'] = cached['etag']
+                if 'last-modified' in cached:
+                    headers['If-Modified-Since'] = cached['last-modified']
+            with (session or requests).get(url, headers=headers, allow_redirects=allow_redir, stream=True, timeout=CSC.LOGO_TIMEOUT) as r:
+                if r.status_code == 304 and cached:
+                    return f'[ {CSC.highlight("OK", color="green", bold=True)} ] {CSC.highlight(env_name, underline=True)} URL [ {url} ] (not modified)'
+                if r.status_code not in [ 200, 206 ]:
+                    return f'{ko_msg} {CSC.highlight("status_code " + str(r.status_code), color="yellow")}'
+                content_type = r.headers.get('content-type', '').split(';')[0].strip()
+                signature = next(r.iter_content(CSC.LOGO_SIGNATURE_LENGTH), b'')
+                validators = { k: r.headers[k] for k in [ 'etag', 'last-modified' ] if k in r.headers }
+            if cache is not None:
+                cache.pop(url, None)
+            if check_extension and extension in content_types and content_type != content_types[extension]:
+                return f'{ko_msg} {CSC.highlight("content-type " + content_type, color="yellow")}'
+            elif check_extension and extension not in content_types:
+                return f'{ko_msg} {CSC.highlight("Unable to check content-type " + content_type, color="yellow")}'
+            elif content_type not in CSC.LOGO_SIGNATURES:
+                return f'{ko_msg} {CSC.highlight("content-type " + content_type, color="yellow")}'
+            elif not signature.startswith(CSC.LOGO_SIGNATURES[content_type]):
+                return f'{ko_msg} {CSC.highlight("file signature does not match content-type " + content_type, color="yellow")}'
             else:
+                if cache is not None and validators:
+                    cache[url] = validators
                 return f'[ {CSC.highlight("OK", color="green", bold=True)} ] {CSC.highlight(env_name, underline=True)} URL [ {url} ]'
         except Exception as e:
-            return f'[ {CSC.highlight("KO", color="red", bold=True)} ] Logo test {CSC.highlight(env_name, color="DeepSkyBlue2")} failed for URL [ {url} ]: {CSC.highlight("an exception has been thrown", color="yellow")}\n{e}'
+            return f'{ko_msg} {CSC.highlight("an exception has been thrown", color="yellow")}\n{e}'
 
     @staticmethod
-    def check_logos(logger=None):
+    def check_logos(logger=None, use_cache=True):
         err_func = logger.error if logger else print
         info_func = logger.info if logger else print
         error_level = 0
-        info_func(CSC.highlight('Checking service logos', bold=True))
-        for k, v in CSC.service_logo_URLs.items():
-            s = CSC._check_logo(k, v)
-            if 'KO' in s:
-                error_level = 2
-                err_func(s)
-            else:
-                info_func(s)
-        info_func(CSC.highlight('\nChecking OAuth logos', bold=True))
-        for k, v in CSC.oauth_logo_URLs.items():
-            s = CSC._check_logo(k, v)
-            if 'KO' in s:
-                error_level = 2
-                err_func(s)
-            else:
-                info_func(s)
+        session = CSC._build_http_session()
+        cache = load_json_cache(CSC.LOGO_CACHE_FILE_NAME) if use_cache else None
+        with concurrent_futures.ThreadPoolExecutor(max_workers=CSC.DEFAULT_POOL_MAXSIZE, thread_name_prefix='csc-logo') as executor:
+            # every URL is checked concurrently, results are shown in declaration order
+            checks = [
+                ('Checking service logos', [ executor.submit(CSC._check_logo, k, v, session=session, cache=cache) for k, v in CSC.service_logo_URLs.items() ]),
+                ('\nChecking OAuth logos', [ executor.submit(CSC._check_logo, k, v, session=session, cache=cache) for k, v in CSC.oauth_logo_URLs.items() ])
+            ]
+            for title, futures in checks:
+                info_func(CSC.highlight(title, bold=True))
+                for f in futures:
+                    s = f.result()
+                    if 'KO' in s:
+                        error_level = 2
+                        err_func(s)
+                    else:
+                        info_func(s)
+        if cache is not None:
+            save_json_cache(CSC.LOGO_CACHE_FILE_NAME, cache)
         return error_level
 
+    def _print_header(self, context):
+        self.logger.info(f'{CSC.highlight("Using endpoint:", bold=True)} {CSC.highlight(context, underline=True)}')
+        if self.username is not None:
+            self.logger.info(f'{CSC.highlight("Using account:", bold=True)} {CSC.highlight(self.username, "DeepSkyBlue2")}')
+        if self.credential_encoded is not None:
+            self.logger.debug(f'{CSC.highlight("Using authorization header:", bold=True)} {self.credential_encoded}')
+        self.logger.debug('\n###\n')
+
     def _set_error_level(self, value):
         if not self.error_level or self.error_level < value:
             self.error_level = value
@@ -1939,7 +4138,7 @@ class CSC(object):
         self.logger.info(f'DEBUG - exit value {self.error_level}')  # TODO remove
         return self.error_level
 
-    def __init__(self, user=None, passw='password', pin='12345678', env=None, context=None, session_key=None, quiet=False, logger=None, noout=False):
+    def __init__(self, user=None, passw='password', pin='12345678', env=None, context=None, session_key=None, quiet=False, logger=None, noout=False, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True, concurrent_tests=False, jobs=1, timing_report=None, response_cache=True, page_size=DEFAULT_PAGE_SIZE, token_cache=False, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=None, retries=DEFAULT_RETRIES, deadline=None, cassette=None):
         self.logger = logger if logger else get_logger()
 
         if not env and not context:
@@ -1949,6 +4148,10 @@ class CSC(object):
         if not context:
             context = CSC.env_URLs[env]
 
+        self.context = context
+        if context.startswith('mock://'):
+            # local mock server, started on first use
+            context = MockCSCServer.from_context(context)
         self.service_URLs = {
             'info': context + '/info',
             'auth/login': context + '/auth/login',
@@ -1965,6 +4168,43 @@ class CSC(object):
             'unsupported/service': context + '/unsupported/service'
         }
 
+        # a single keep-alive connection pool shared by every service call (and by every credential worker)
+        pool_maxsize = max(pool_maxsize, jobs)
+        self.http_session = CSC._build_http_session(pool_connections, pool_maxsize, keep_alive)
+        # independent test cases of a single service are sent in parallel, at most one per pooled connection
+        self.concurrent_tests = concurrent_tests
+        self.test_workers = pool_maxsize
+        self.test_executor = None
+        # number of credentials tested in parallel, by the workers currently running
+        self.jobs = jobs
+        self.workers = set()
+        self.workers_lock = threading.Lock()
+        # one record per HTTP exchange (the last MAX_HTTP_RECORDS ones) and per-service counters, shared
+        # with the credential workers
+        self.http_records = deque(maxlen=CSC.MAX_HTTP_RECORDS)
+        self.http_totals = OrderedDict()
+        self.timing_report = timing_report
+        # per-run cache of the idempotent service responses, shared with the credential workers
+        self.response_cache = OrderedDict() if response_cache else None
+        self.response_cache_lock = threading.Lock()
+        self.response_cache_stats = OrderedDict()
+        # connect timeout, read timeout of every service (None → per service default), retries of the idempotent services
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.retry_stats = OrderedDict()
+        # time budget of global_test (s) and current phase of its checks: None (every check),
+        # 'critical' (level 3 checks only) or 'other'
+        self.deadline = deadline
+        # --record/--replay: Cassette shared by every CSC instance of the run
+        self.cassette = cassette
+        self.phase = None
+        self.phase_SADs = {}
+        # credentials/list maxResults used to iterate every credential, an int or 'auto'
+        self.page_size = page_size
+        # False when the last credentials listing stopped on an error response
+        self.listing_complete = True
+
         self.test_credentials = True
         self.test_invalid_credentials = True
 
@@ -1973,20 +4213,21 @@ class CSC(object):
         self.credential_encoded = None if not user else base64.b64encode(bytes(f'{self.username}:{passw}', 'utf-8')).decode('utf-8')
         self.session_key = session_key
         self.refresh_token = None
+        # sessions kept across runs in the local cache, never revoked at the end of the run
+        self.token_cache = token_cache
+        self.cached_session = False
+        self.credential_IDs = []
         self.DEFAULT_PIN = pin
         self.SAD = None
         self.error_level = 0
+        self.test_counts = { 'OK': 0, 'KO': 0 }
         self.quiet = quiet
+        # progress dots of the credentials listing
+        self.progress = True
 
         if not noout:
             self.logger.debug(CSC.getinfostr())
-            self.logger.info(f'{CSC.highlight("Using endpoint:", bold=True)} {CSC.highlight(context, underline=True)}')
-            if self.username is not None:
-                self.logger.info(f'{CSC.highlight("Using account:", bold=True)} {CSC.highlight(self.username, "DeepSkyBlue2")}')
-            if self.credential_encoded is not None:
-                self.logger.debug(f'{CSC.highlight("Using authorization header:", bold=True)} {self.credential_encoded}')
-            self.logger.debug('\n###\n')
-
+            self._print_header(context)
             signal.signal(signal.SIGINT, self._sig_handler)
             signal.signal(signal.SIGTERM, self._sig_handler)
 
@@ -1998,6 +4239,416 @@ class CSC(object):
                 self.logger.info(CSC.highlight('Update \'requests` module or execute `export PYTHONWARNINGS="ignore:Unverified HTTPS request"` to suppress HTTPS warnings', 'yellow'))
 
 
+class FanOut(object):
+
+    # the same tests against many contexts or accounts at once: every target has its own CSC instance,
+    # HTTP session and buffered output, flushed as a whole in targets order and followed by a
+    # consolidated report
+    TESTS = OrderedDict([
+        ('info', 'info_test'),
+        ('errors', 'generic_errors'),
+        ('login', 'login_test'),
+        ('timestamp', 'timestamp_test'),
+        ('list', 'list_test')
+    ])
+    # tests requiring a session key
+    SESSION_TESTS = [ 'timestamp', 'list' ]
+    RESULTS = {
+        0: ('OK', 'green'),
+        1: ('ERROR', 'red'),
+        2: ('FAILED', 'yellow'),
+        3: ('CRITICAL', 'red')
+    }
+
+    def __init__(self, logger, csc_options=None, workers=None, per_host=None):
+        self.logger = logger
+        # a single timing report for every target
+        self.timing_report = (csc_options or {}).get('timing_report')
+        self.csc_options = dict(csc_options or {}, timing_report=None)
+        # targets tested at once, overall and on the same host
+        self.workers = workers
+        self.per_host = per_host
+        self.results = []
+        self.elapsed = 0.0
+
+    @staticmethod
+    def virtual_host_targets(names=None):
+        # (name, context) of every context of the selected virtual hosts, all of them by default.
+        # Environment names and context URLs are accepted as well
+        targets = []
+        for name in names or CSC.virtual_host.keys():
+            if name in CSC.virtual_host:
+                envs = CSC.virtual_host[name]
+                targets += [ (name if len(envs) == 1 else f'{name}/{env}', url) for env, url in envs.items() ]
+            elif name in CSC.env_URLs:
+                targets.append((name, CSC.env_URLs[name]))
+            elif re.match('(https?|mock)://', name):
+                targets.append((name, name))
+            else:
+                raise RuntimeError(f'*** Unknown virtual host {name} ***')
+        return targets
+
+    @staticmethod
+    def account_targets(users_data, environments=None, virtual_hosts=None):
+        # (name, context, username, password) of every (user, environment) pair of a csccredentials.json
+        # file, on the environment context or on the selected virtual hosts
+        targets = []
+        for username in sorted(users_data):
+            if username == 'cache':
+                continue
+            for e in users_data[username].get('environment', []):
+                for env in e.get('name', []):
+                    if environments and env not in environments:
+                        continue
+                    if virtual_hosts:
+                        contexts = [ (f'{username}@{v}', CSC.virtual_host[v][env]) for v in virtual_hosts if env in CSC.virtual_host[v] ]
+                    elif env in CSC.env_URLs:
+                        contexts = [ (f'{username}@{env}', CSC.env_URLs[env]) ]
+                    else:
+                        contexts = []
+                    targets += [ (name, context, username, e.get('password', 'password')) for name, context in contexts ]
+        return targets
+
+    @staticmethod
+    def tests_job(tests=None):
+        # global_test, or the selected tests in declaration order
+        if not tests:
+            return lambda csc: csc.global_test()
+        return lambda csc: FanOut._run_tests(csc, tests)
+
+    @staticmethod
+    def _run_tests(csc, tests):
+        # the selected tests, in declaration order
+        for name, method in FanOut.TESTS.items():
+            if name not in tests:
+                continue
+            if name in FanOut.SESSION_TESTS and csc.session_key is None:
+                csc.session_key = csc._get_session_key()
+                if not csc.session_key:
+                    csc._set_error_level(1)
+                    raise RuntimeError('*** Session key unavailable ***')
+            getattr(csc, method)()
+        # a session of the token cache is kept for the next runs
+        if csc.session_key is not None and not csc.cached_session:
+            csc.single_revoke(csc.refresh_token, noout=True)
+        csc.print_run_summary()
+
+    def _run_target(self, name, context, user, passw, job):
+        logger = logging.Logger(f'{__name__}.fanout')
+        logger.setLevel(self.logger.getEffectiveLevel())
+        logger.addHandler(BufferingHandler(sys.maxsize))
+        result = { 'name': name, 'context': context, 'user': user, 'error_level': 0, 'OK': 0, 'KO': 0, 'requests': 0, 'failed': 0, 'p50': None }
+        csc = None
+        t0 = time.perf_counter()
+        try:
+            # no signal handlers outside of the main thread
+            csc = CSC(user, passw, context=context, quiet=True, logger=logger, noout=True, **self.csc_options)
+            csc.progress = False
+            csc._print_header(context)
+            job(csc)
+        except SystemExit:
+            pass
+        except RuntimeError as e:
+            logger.error(CSC.highlight(e, 'red', bold=True))
+        except Exception as e:
+            logger.error('{} {}'.format(CSC.highlight('An error occurred:', 'red', bold=True), e))
+            result['error_level'] = 1
+        result['elapsed'] = time.perf_counter() - t0
+        if csc is not None:
+            latencies = sorted([ rec['total'] for rec in csc.http_records ])
+            result.update({
+                'error_level': max(result['error_level'], csc.error_level),
+                'OK': csc.test_counts['OK'],
+                'KO': csc.test_counts['KO'],
+                'requests': csc.get_request_count(),
+                'failed': sum([ t['failed'] for t in csc.http_totals.values() ]),
+                'p50': CSC._percentile(latencies, 50) if latencies else None,
+                'summary': csc.get_timing_summary(),
+                'records': list(csc.http_records) if self.timing_report else []
+            })
+            csc.http_session.close()
+        else:
+            result['error_level'] = 1
+        return result, logger.handlers[0].buffer
+
+    def run(self, targets, job):
+        # targets: (name, context, username, password), job: the function testing a CSC instance.
+        # The exit value is the worst one
+        workers = self.workers or len(targets)
+        results = [ None ] * len(targets)
+        hosts = [ urlsplit(t[1]).netloc for t in targets ]
+        busy = {}
+        waiting = deque(range(len(targets)))
+        running = {}
+        flushed = 0
+        t0 = time.perf_counter()
+        with concurrent_futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='csc-fanout') as executor:
+            while len(waiting) > 0 or len(running) > 0:
+                # start the first waiting targets whose host is below its limit
+                for i in list(waiting):
+                    if len(running) >= workers:
+                        break
+                    if self.per_host and busy.get(hosts[i], 0) >= self.per_host:
+                        continue
+                    waiting.remove(i)
+                    busy[hosts[i]] = busy.get(hosts[i], 0) + 1
+                    running[executor.submit(self._run_target, *targets[i], job)] = i
+                done, _ = concurrent_futures.wait(running, return_when=concurrent_futures.FIRST_COMPLETED)
+                for f in done:
+                    i = running.pop(f)
+                    busy[hosts[i]] -= 1
+                    results[i] = f.result()
+                # the output of every target is flushed as a whole, following the targets order
+                while flushed < len(targets) and results[flushed] is not None:
+                    result, records = results[flushed]
+                    self.logger.info(CSC.highlight(f'\n=== {result["name"]} ===', 'DeepSkyBlue2', bold=True))
+                    for record in records:
+                        self.logger.handle(record)
+                    self.results.append(result)
+                    flushed += 1
+        self.elapsed = time.perf_counter() - t0
+        self.print_report()
+        if self.timing_report:
+            self.write_timing_report()
+        return max([ r['error_level'] for r in self.results ] + [ 0 ])
+
+    def print_report(self):
+        name_len = max([ len(r['name']) for r in self.results ] + [ 6 ])
+        self.logger.info(CSC.highlight(f'\nConsolidated report: {len(self.results)} target{"" if len(self.results) == 1 else "s"} in {self.elapsed:.1f} s', bold=True))
+        self.logger.info(CSC.highlight(f'{"target":<{name_len}} {"result":<8} {"exit":>4} {"OK":>5} {"KO":>5} {"reqs":>5} {"fail":>5} {"p50 ms":>8} {"time s":>7}', underline=True))
+        for r in self.results:
+            label, color = FanOut.RESULTS.get(r['error_level'], FanOut.RESULTS[1])
+            p50 = f'{r["p50"] * 1000:>8.1f}' if r['p50'] is not None else f'{"-":>8}'
+            self.logger.info(f'{r["name"]:<{name_len}} {CSC.highlight(f"{label:<8}", color, bold=True)} {r["error_level"]:>4} {r["OK"]:>5} {r["KO"]:>5} {r["requests"]:>5} {r["failed"]:>5} {p50} {r["elapsed"]:>7.1f}')
+
+    def write_timing_report(self):
+        report = OrderedDict([ (r['name'], { 'context': r['context'], 'summary': r.get('summary', {}), 'records': r.get('records', []) }) for r in self.results ])
+        try:
+            with open(self.timing_report, 'w') as f:
+                json.dump(report, f, indent=4)
+        except Exception as e:
+            self.logger.error('{} {}'.format(CSC.highlight(f'An error occurred while writing the timing report {self.timing_report}', 'red', bold=True), e))
+
+
+class MonitorHandler(object):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.monitor.render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Monitor(object):
+
+    # long-running probe of a single session: info, timestamp and a PIN only signHash every interval,
+    # counters and latency histograms exposed in the Prometheus text format on /metrics
+    PROBES = [ 'info', 'timestamp', 'signHash' ]
+    # the session is refreshed once this fraction of its lifetime has elapsed
+    REFRESH_AGE = 0.8
+    DEFAULT_EXPIRES_IN = 3600
+    BUCKETS = [ 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0 ]
+    MAX_RECORDS = 1000
+
+    def __init__(self, csc, interval=30, credential_id=None, num_signatures=1000, host='127.0.0.1', port=9108):
+        self.csc = csc
+        self.logger = csc.logger
+        # the HTTP records of a daemon must not grow forever
+        self.csc.http_records = deque(maxlen=Monitor.MAX_RECORDS)
+        self.interval = interval
+        self.credential_id = credential_id
+        self.num_signatures = num_signatures
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.sad_manager = None
+        self.sign_payload = None
+        self.refresh_at = None if csc.session_key is None else math.inf
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.probes = OrderedDict((p, { 'ok': 0, 'failed': 0, 'up': 0, 'sum': 0.0, 'buckets': [ 0 ] * len(Monitor.BUCKETS), 'last': 0.0 }) for p in self.active_probes())
+        self.renewals = OrderedDict([ ('refresh', 0), ('login', 0), ('failed', 0) ])
+
+    def active_probes(self):
+        return [ p for p in Monitor.PROBES if p != 'signHash' or self.credential_id ]
+
+    def _auth(self, headers, payload):
+        headers['Content-Type'] = 'application/json'
+        r = self.csc._service_request('auth/login', 'POST', test_name='monitor', headers=headers, json=payload)
+        j = r.json() if r.text else {}
+        if 'error' in j or 'access_token' not in j:
+            raise RuntimeError(f'*** Login failed {"" if "error_description" not in j else (": " + j["error_description"])} ***')
+        self.csc.session_key = j['access_token']
+        if 'refresh_token' in j:
+            self.csc.refresh_token = j['refresh_token']
+        self.refresh_at = time.monotonic() + j.get('expires_in', Monitor.DEFAULT_EXPIRES_IN) * Monitor.REFRESH_AGE
+
+    def open_session(self):
+        if self.csc.session_key is None:
+            self._auth({ 'Authorization': 'Basic ' + self.csc.credential_encoded }, { 'rememberMe': True })
+        self.logger.info(CSC.highlight(f'Using session key {self.csc.session_key}', 'yellow'))
+
+    def _renew_session(self):
+        # refresh_token first, then a new login
+        if self.csc.refresh_token is not None:
+            try:
+                self._auth({}, { 'refresh_token': self.csc.refresh_token })
+                self.renewals['refresh'] += 1
+                return
+            except Exception as e:
+                self.logger.warn(CSC.highlight(f'Session refresh failed: {str(e).strip("* ")}', 'yellow'))
+                self.csc.refresh_token = None
+        if self.csc.credential_encoded is None:
+            raise RuntimeError('*** Session expired and no login credential available ***')
+        self._auth({ 'Authorization': 'Basic ' + self.csc.credential_encoded }, { 'rememberMe': True })
+        self.renewals['login'] += 1
+
+    def _ensure_session(self):
+        if self.refresh_at is not None and time.monotonic() < self.refresh_at:
+            return True
+        try:
+            self._renew_session()
+            return True
+        except Exception as e:
+            self.renewals['failed'] += 1
+            self.logger.error(CSC.highlight(f'Session unavailable: {str(e).strip("* ")}', 'red', bold=True))
+            return False
+
+    def _request(self, service, payload=None):
+        headers = { 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + self.csc.session_key }
+        r = self.csc._service_request(service, 'GET' if payload is None else 'POST', test_name='monitor', use_cache=False, headers=headers, json=payload)
+        j = r.json() if r.text else {}
+        if r.status_code == 401 or j.get('error') == 'invalid_token':
+            # renewed before the next probe
+            self.refresh_at = 0
+        return j
+
+    def _probe_info(self):
+        j = self._request('info')
+        return 'error' not in j and 'name' in j
+
+    def _probe_timestamp(self):
+        j = self._request('signatures/timestamp', { 'hash': 'uB28DAYaAZ+74aWHm30uDgeVB18=', 'hashAlgo': '1.3.14.3.2.26' })
+        return 'error' not in j and 'timestamp' in j
+
+    def _probe_signHash(self):
+        if self.sad_manager is None:
+            algos = self.csc._pin_only_sign_algos(self.credential_id)
+            self.sign_payload = CSC._sign_hash_payload(self.credential_id, algos[0])
+            self.sad_manager = SADManager(self.csc, self.credential_id, self.num_signatures)
+        sad = self.sad_manager.acquire()
+        try:
+            j = self._request('signatures/signHash', dict(self.sign_payload, SAD=sad))
+        finally:
+            self.sad_manager.release(sad)
+        if 'SAD' in j.get('error_description', ''):
+            self.sad_manager.invalidate(sad)
+        return 'error' not in j and isinstance(j.get('signatures'), list) and len(j['signatures']) == 1
+
+    def _observe(self, probe, ok, elapsed):
+        with self.lock:
+            p = self.probes[probe]
+            p['ok' if ok else 'failed'] += 1
+            p['up'] = 1 if ok else 0
+            p['sum'] += elapsed
+            p['last'] = time.time()
+            for i, le in enumerate(Monitor.BUCKETS):
+                if elapsed <= le:
+                    p['buckets'][i] += 1
+
+    def run_probes(self):
+        results = []
+        session = self._ensure_session()
+        for probe in self.active_probes():
+            t0 = time.perf_counter()
+            try:
+                ok = session and getattr(self, f'_probe_{probe}')()
+            except Exception as e:
+                self.logger.error('{} {}'.format(CSC.highlight(f'{probe} probe failed:', 'red', bold=True), str(e).strip('* ')))
+                if self.sad_manager is not None and self.sad_manager.error:
+                    # a new SAD at the next probe
+                    self.sad_manager = None
+                ok = False
+            elapsed = time.perf_counter() - t0
+            self._observe(probe, ok, elapsed)
+            results.append(f'{probe} {elapsed * 1000:.1f} ms {CSC.highlight("OK", "green", bold=True) if ok else CSC.highlight("KO", "red", bold=True)}')
+        self.logger.info(f'{time.strftime("%Y-%m-%d %H:%M:%S")}  ' + '  '.join(results))
+
+    def render_metrics(self):
+        lines = [
+            '# HELP csc_monitor_info Monitored context.',
+            '# TYPE csc_monitor_info gauge',
+            f'csc_monitor_info{{context="{self.csc.context}",version="{__version__}"}} 1',
+            '# HELP csc_monitor_start_time_seconds Start time of the monitor.',
+            '# TYPE csc_monitor_start_time_seconds gauge',
+            f'csc_monitor_start_time_seconds {self.start_time:.3f}',
+            '# HELP csc_session_renewals_total Session renewals by method.',
+            '# TYPE csc_session_renewals_total counter'
+        ]
+        with self.lock:
+            lines += [ f'csc_session_renewals_total{{method="{k}"}} {v}' for k, v in self.renewals.items() ]
+            lines += [ '# HELP csc_probe_total Probes by result.', '# TYPE csc_probe_total counter' ]
+            for probe, p in self.probes.items():
+                lines += [ f'csc_probe_total{{probe="{probe}",result="ok"}} {p["ok"]}', f'csc_probe_total{{probe="{probe}",result="failed"}} {p["failed"]}' ]
+            lines += [ '# HELP csc_probe_up 1 if the last probe succeeded.', '# TYPE csc_probe_up gauge' ]
+            lines += [ f'csc_probe_up{{probe="{probe}"}} {p["up"]}' for probe, p in self.probes.items() ]
+            lines += [ '# HELP csc_probe_last_time_seconds Time of the last probe.', '# TYPE csc_probe_last_time_seconds gauge' ]
+            lines += [ f'csc_probe_last_time_seconds{{probe="{probe}"}} {p["last"]:.3f}' for probe, p in self.probes.items() ]
+            lines += [ '# HELP csc_probe_duration_seconds Probe latency.', '# TYPE csc_probe_duration_seconds histogram' ]
+            for probe, p in self.probes.items():
+                lines += [ f'csc_probe_duration_seconds_bucket{{probe="{probe}",le="{le:g}"}} {n}' for le, n in zip(Monitor.BUCKETS, p['buckets']) ]
+                lines += [
+                    f'csc_probe_duration_seconds_bucket{{probe="{probe}",le="+Inf"}} {p["ok"] + p["failed"]}',
+                    f'csc_probe_duration_seconds_sum{{probe="{probe}"}} {p["sum"]:.6f}',
+                    f'csc_probe_duration_seconds_count{{probe="{probe}"}} {p["ok"] + p["failed"]}'
+                ]
+        return '\n'.join(lines) + '\n'
+
+    def start(self):
+        self.httpd = http_server.ThreadingHTTPServer((self.host, self.port), http_request_handler(MonitorHandler))
+        self.httpd.daemon_threads = True
+        self.httpd.monitor = self
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name='csc-metrics', daemon=True).start()
+        return f'http://{self.host}:{self.port}/metrics'
+
+    def run(self):
+        # fixed rate schedule: a late cycle skips the missed ticks
+        next_run = time.monotonic()
+        while not self.stop_event.is_set():
+            self.run_probes()
+            next_run += self.interval
+            now = time.monotonic()
+            if next_run < now:
+                next_run += math.ceil((now - next_run) / self.interval) * self.interval
+            self.stop_event.wait(next_run - now)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def close(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.sad_manager is not None:
+            self.sad_manager.close()
+        if self.csc.session_key is not None and self.csc.credential_encoded is not None:
+            # only the sessions opened by the monitor are revoked
+            self.csc.single_revoke(self.csc.refresh_token)
+
+
 def print_version(ctx, param, value):
     if not value or ctx.resilient_parsing:
         return
@@ -2011,7 +4662,19 @@ def validate_session(ctx, param, value):
     return value
 
 
-def initialize_with_TUI(quiet, logger, noout=False):
+def validate_page_size(ctx, param, value):
+    if value == 'auto':
+        return value
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise click.BadParameter(f'{value} is neither a number nor \'auto\'')
+    if page_size < 1:
+        raise click.BadParameter(f'{value} is not a valid page size')
+    return page_size
+
+
+def initialize_with_TUI(quiet, logger, noout=False, **kwargs):
     m = CSCCursesMenu(CSCCursesMenu.DEFAULT_CREDENTIALS_FILE_NAME)
     try:
         data = m.display()
@@ -2030,7 +4693,7 @@ def initialize_with_TUI(quiet, logger, noout=False):
         logger.error(CSC.highlight('A problem occurred while getting data from the TUI', 'red', bold=True))
         sys.exit(1)
 
-    return CSC(data['username'], data['password'], context=data['ctx_path'], session_key=data['session_key'], quiet=quiet, logger=logger, noout=noout)
+    return CSC(data['username'], data['password'], context=data['ctx_path'], session_key=data['session_key'], quiet=quiet, logger=logger, noout=noout, **kwargs)
 
 
 @click.group(context_settings=dict(help_option_names=['-h', '--help']), invoke_without_command=True)
@@ -2040,9 +4703,25 @@ def initialize_with_TUI(quiet, logger, noout=False):
 @click.option('--session', '-s', metavar='<session-key>', callback=validate_session, help='A valid CSC access token. If provided, no authentication using username/password will be performed.')
 @click.option('--quiet', '-q', is_flag=True, default=False, help='Non-interactive mode: every test requiring a user interaction will be skipped. Only automatic credentials (PIN only) will be checked using the default PIN. WARNING the default PIN is 12345678.')
 @click.option('--log', '-l', type=click.Path(exists=False, resolve_path=True), metavar='<path-to-log-file>', help='Log file path. If present, the output will be written to this file. If not, no log file will be created and STDOUT will be used.')
+@click.option('--pool-size', metavar='<n>', type=click.IntRange(min=1), default=CSC.DEFAULT_POOL_CONNECTIONS, show_default=True, help='Number of per-host connection pools kept by the HTTP session.')
+@click.option('--pool-per-host', metavar='<n>', type=click.IntRange(min=1), default=CSC.DEFAULT_POOL_MAXSIZE, show_default=True, help='Maximum number of keep-alive connections per host.')
+@click.option('--no-keep-alive', is_flag=True, default=False, help='Close the connection after every request instead of reusing it.')
+@click.option('--concurrent', '-c', is_flag=True, default=False, help='Send the independent test cases of every service in parallel. Test cases changing the server state (e.g. wrong PIN) are always sent sequentially.')
+@click.option('--jobs', '-j', metavar='<n>', type=click.IntRange(min=1), default=1, show_default=True, help='Number of credentials tested in parallel (quiet mode only). The output of every credential is kept grouped.')
+@click.option('--timing-report', type=click.Path(dir_okay=False, resolve_path=True), metavar='<path-to-json-file>', help='Write every HTTP exchange (connect, TLS, time to first byte and total time) and the per-service latency summary to a JSON file.')
+@click.option('--no-response-cache', is_flag=True, default=False, help='Send every info, credentials/info and credentials/list request, even when an identical one has already been answered successfully during the run. Test cases are always sent.')
+@click.option('--page-size', metavar='<n|auto>', default=str(CSC.DEFAULT_PAGE_SIZE), show_default=True, callback=validate_page_size, help='credentials/list maxResults used to iterate the credentials. With `auto\' the page size is tuned on the measured listing throughput and the chosen value is reported.')
+@click.option('--connect-timeout', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), default=CSC.DEFAULT_CONNECT_TIMEOUT, show_default=True, help='TCP/TLS connection timeout.')
+@click.option('--read-timeout', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), help=f'Response timeout of every service. By default it depends on the service ({CSC.DEFAULT_READ_TIMEOUT:g} s unless tuned, e.g. {CSC.SERVICE_READ_TIMEOUTS["signatures/signHash"]:g} s for signHash).')
+@click.option('--retries', metavar='<n>', type=click.IntRange(min=0), default=CSC.DEFAULT_RETRIES, show_default=True, help='Retries of the idempotent services (info, credentials/list, credentials/info, timestamp) after connection errors, timeouts and 502/503/504 responses, with jittered exponential backoff. Requests to a host failing repeatedly are stopped for a while by a circuit breaker.')
+@click.option('--deadline', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), help='Time budget of the global test (quiet mode only): the level 3 checks (valid authorize, extend and signHash) of every credential run first, the other checks while the budget lasts. Skipped checks are reported, the exit value is at least 1 if a level 3 check was skipped.')
+@click.option('--record', type=click.Path(dir_okay=False, resolve_path=True), metavar='<path-to-cassette>', help='Write every CSC request and response of the run, with its latency, to a gzipped cassette file.')
+@click.option('--replay', type=click.Path(exists=True, dir_okay=False, resolve_path=True), metavar='<path-to-cassette>', help='Serve the CSC responses from a cassette written by --record instead of sending the requests: checks are re-validated offline. The token cache and the info logo check are disabled.')
+@click.option('--replay-latency', is_flag=True, default=False, help='With --replay, wait the recorded latency before every response.')
+@click.option('--token-cache', is_flag=True, default=False, help='Keep the session of every account and context in a local cache, readable by the owner only, and reuse it in the next runs, renewing it with its refresh token. Cached sessions are not revoked at the end of the run.')
 @click.option('--version', '-V', is_flag=True, expose_value=False, callback=print_version, is_eager=True, help='Print version information and exit.')
 @click.pass_context
-def main(ctx, quiet, user, passw, environment, session, log):
+def main(ctx, quiet, user, passw, environment, session, log, pool_size, pool_per_host, no_keep_alive, concurrent, jobs, timing_report, no_response_cache, page_size, connect_timeout, read_timeout, retries, deadline, record, replay, replay_latency, token_cache):
 
     """
     Utility script for Cloud Signature Consortium (CSC) API testing.
@@ -2065,17 +4744,47 @@ def main(ctx, quiet, user, passw, environment, session, log):
 
     ctx.ensure_object(dict)
     logger = get_logger(log)
+    if record and replay:
+        raise click.UsageError('--record and --replay are mutually exclusive')
+    if replay_latency and not replay:
+        raise click.UsageError('--replay-latency requires --replay')
+    cassette = None
+    if record:
+        cassette = Cassette(record)
+        atexit.register(cassette.save)
+    elif replay:
+        try:
+            cassette = Cassette(replay, replay=True, latency=replay_latency)
+        except RuntimeError as e:
+            raise click.BadParameter(str(e).strip('* '), param_hint='--replay')
+    csc_options = {
+        'pool_connections': pool_size,
+        'pool_maxsize': pool_per_host,
+        'keep_alive': not no_keep_alive,
+        'concurrent_tests': concurrent,
+        'jobs': jobs,
+        'timing_report': timing_report,
+        'response_cache': not no_response_cache,
+        'page_size': page_size,
+        'token_cache': token_cache and not replay,
+        'connect_timeout': connect_timeout,
+        'read_timeout': read_timeout,
+        'retries': retries,
+        'deadline': deadline,
+        'cassette': cassette
+    }
 
     # default command = `check'
     if ctx.invoked_subcommand is None:
         if not environment or (not user or not passw) and not session:
-            csc = initialize_with_TUI(quiet, logger)
+            csc = initialize_with_TUI(quiet, logger, **csc_options)
         else:
-            csc = CSC(user, passw, env=environment, session_key=session, quiet=quiet, logger=logger)
+            csc = CSC(user, passw, env=environment, session_key=session, quiet=quiet, logger=logger, **csc_options)
         csc.global_test()
         sys.exit(csc.get_error_level())
 
     ctx.obj['environment'] = environment
+    ctx.obj['csc_options'] = csc_options
     ctx.obj['logger'] = logger
     ctx.obj['password'] = passw
     ctx.obj['quiet'] = quiet
@@ -2092,20 +4801,23 @@ def list_environments():
 
 
 @main.command()
+@click.option('--no-cache', is_flag=True, default=False, help='Ignore the ETag/Last-Modified cache and fully check every logo.')
 @click.pass_context
-def logo(ctx):
+def logo(ctx, no_cache):
     """Check logo files and exit"""
-    sys.exit(CSC.check_logos(ctx.obj['logger']))
+    sys.exit(CSC.check_logos(ctx.obj['logger'], use_cache=not no_cache))
 
 
 @main.command(short_help='Scan the user credentials: no signature test will be performed, only the credential details will be shown.')
+@click.option('--incremental', '-i', is_flag=True, default=False, help='Keep a local snapshot of the account credentials: only new, changed or expired credentials are fetched again, and the differences with the previous run are shown.')
+@click.option('--ttl', metavar='<hours>', type=click.FloatRange(min=0), default=CSC.DEFAULT_SNAPSHOT_TTL / 3600, show_default=True, help='Maximum age of a credential snapshot in incremental mode.')
 @click.pass_context
-def scan(ctx):
+def scan(ctx, incremental, ttl):
     if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
-        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'])
+        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **ctx.obj['csc_options'])
     else:
-        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'])
-    csc.scan()
+        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **ctx.obj['csc_options'])
+    csc.scan(incremental, ttl * 3600)
     sys.exit(csc.get_error_level())
 
 
@@ -2114,29 +4826,199 @@ def scan(ctx):
 @click.pass_context
 def check(ctx, credential_id):
     if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
-        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'])
+        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **ctx.obj['csc_options'])
     else:
-        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'])
+        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **ctx.obj['csc_options'])
     if len(credential_id) > 0:
-        for i in range(len(credential_id)):
-            csc.check_credential(credential_id[i], ask_revoke=(i == len(credential_id) - 1), login_executed=(i > 0))
+        csc.check_credentials(credential_id)
     else:
         csc.global_test()
     sys.exit(csc.get_error_level())
 
 
+@main.command(short_help='Sustained signHash load test on a PIN only credential: throughput, error rate and latency percentiles per signAlgo.')
+@click.argument('credential_id', nargs=1)
+@click.option('--duration', '-d', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), default=30, show_default=True, help='Benchmark duration.')
+@click.option('--concurrency', '-n', metavar='<n>', type=click.IntRange(min=1), default=4, show_default=True, help='Requests in flight (closed loop) or maximum requests in flight (open loop).')
+@click.option('--rate', '-r', metavar='<req/s>', type=click.FloatRange(min=0, min_open=True), help='Target arrival rate: enables the open-loop mode, latencies are measured from the intended send time.')
+@click.option('--num-signatures', metavar='<n>', type=click.IntRange(min=1), default=1000, show_default=True, help='numSignatures of every authorize request: the SAD is renewed before its quota runs out.')
+@click.pass_context
+def bench(ctx, credential_id, duration, concurrency, rate, num_signatures):
+    """Authorize a PIN only credential and drive signatures/signHash for a fixed duration."""
+    csc_options = dict(ctx.obj['csc_options'], pool_maxsize=max(ctx.obj['csc_options']['pool_maxsize'], concurrency))
+    if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
+        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **csc_options)
+    else:
+        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **csc_options)
+    csc.bench(credential_id, duration, concurrency, rate, num_signatures)
+    sys.exit(csc.get_error_level())
+
+
+@main.command(short_help='signHash batch-size sweep on a PIN only credential: signatures per second and per signature latency for batches of 1, 2, 4 ... N digests.')
+@click.argument('credential_id', nargs=1)
+@click.option('--max-batch', '-b', metavar='<n>', type=click.IntRange(min=1), default=64, show_default=True, help='Largest number of digests per signHash request.')
+@click.option('--duration', '-d', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), default=5, show_default=True, help='Duration of every step.')
+@click.option('--concurrency', '-n', metavar='<n>', type=click.IntRange(min=1), default=4, show_default=True, help='Requests in flight.')
+@click.option('--num-signatures', metavar='<n>', type=click.IntRange(min=1), default=1000, show_default=True, help='numSignatures of every authorize request: the SAD is renewed before its quota runs out.')
+@click.pass_context
+def sweep(ctx, credential_id, max_batch, duration, concurrency, num_signatures):
+    """Authorize a PIN only credential and find the signHash batch size where the throughput stops scaling."""
+    csc_options = dict(ctx.obj['csc_options'], pool_maxsize=max(ctx.obj['csc_options']['pool_maxsize'], concurrency))
+    if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
+        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **csc_options)
+    else:
+        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], **csc_options)
+    csc.sweep(credential_id, max_batch, duration, concurrency, num_signatures)
+    sys.exit(csc.get_error_level())
+
+
+@main.command(short_help='Run global_test, or some of its tests, on many virtual hosts at once: one consolidated report, the exit value is the worst one.')
+@click.option('--host', '-H', 'hosts', metavar='<name|url>', multiple=True, help=f'Virtual host ({", ".join(CSC.virtual_host.keys())}), environment or context URL. Can be repeated, every virtual host by default.')
+@click.option('--test', '-t', 'tests', type=click.Choice(FanOut.TESTS.keys()), multiple=True, help='Run only the selected tests instead of global_test. Can be repeated.')
+@click.option('--workers', '-w', metavar='<n>', type=click.IntRange(min=1), help='Hosts tested at once, all of them by default.')
+@click.pass_context
+def fanout(ctx, hosts, tests, workers):
+    """Test many virtual hosts concurrently, each one with its own session (non-interactive: only PIN only credentials are signed with the default PIN)."""
+    if not ctx.obj['user'] or not ctx.obj['password']:
+        raise click.UsageError('--user and --passw are required by fanout')
+    if ctx.obj['session']:
+        raise click.UsageError('A session key is valid on a single virtual host: use --user and --passw')
+    try:
+        targets = FanOut.virtual_host_targets(hosts)
+    except RuntimeError as e:
+        raise click.BadParameter(str(e).strip('* '), param_hint='--host')
+    fan_out = FanOut(ctx.obj['logger'], ctx.obj['csc_options'], workers)
+    sys.exit(fan_out.run([ (name, context, ctx.obj['user'], ctx.obj['password']) for name, context in targets ], FanOut.tests_job(tests)))
+
+
+@main.command(short_help='Run scan or check on every account of the csccredentials.json file at once: the output is grouped by account, the exit value is the worst one.')
+@click.option('--file', '-f', 'file_path', metavar='<path>', type=click.Path(exists=True, dir_okay=False), default=os.path.join(os.path.dirname(os.path.realpath(__file__)), CSCCursesMenu.DEFAULT_CREDENTIALS_FILE_NAME), show_default=True, help='Account database of the TUI.')
+@click.option('--command', 'command', type=click.Choice([ 'scan', 'check' ]), default='scan', show_default=True, help='scan: credential details only, check: global_test.')
+@click.option('--host', '-H', 'hosts', metavar='<name>', type=click.Choice(CSC.virtual_host.keys()), multiple=True, help='Test the accounts on these virtual hosts instead of the environment context. Can be repeated.')
+@click.option('--workers', '-w', metavar='<n>', type=click.IntRange(min=1), default=8, show_default=True, help='Accounts tested at once.')
+@click.option('--per-host', metavar='<n>', type=click.IntRange(min=1), default=2, show_default=True, help='Accounts tested at once on the same host.')
+@click.pass_context
+def fleet(ctx, file_path, command, hosts, workers, per_host):
+    """Test every (user, environment) pair of the TUI account database, non-interactively (only PIN only credentials are signed with the default PIN). Use -e to select a single environment."""
+    try:
+        with open(file_path, 'r') as f:
+            users_data = json.load(f)
+    except ValueError as e:
+        raise click.BadParameter(f'invalid JSON file: {e}', param_hint='--file')
+    targets = FanOut.account_targets(users_data, [ ctx.obj['environment'] ] if ctx.obj['environment'] else None, hosts)
+    if len(targets) == 0:
+        ctx.obj['logger'].error(CSC.highlight(f'No accounts found in {file_path}', 'red', bold=True))
+        sys.exit(1)
+    fan_out = FanOut(ctx.obj['logger'], ctx.obj['csc_options'], workers, per_host)
+    sys.exit(fan_out.run(targets, (lambda csc: csc.scan()) if command == 'scan' else FanOut.tests_job()))
+
+
+@main.command(short_help='Long-running probe of info, timestamp and signHash on a single session, with Prometheus metrics served over HTTP.')
+@click.option('--credential', '-c', 'credential_id', metavar='<credential-id>', help='PIN only credential probed with signHash using the default PIN. Without it no signHash probe is performed.')
+@click.option('--interval', '-i', metavar='<seconds>', type=click.FloatRange(min=0, min_open=True), default=30, show_default=True, help='Time between two probe cycles.')
+@click.option('--host', metavar='<address>', default='127.0.0.1', show_default=True, help='Listening address of the metrics endpoint.')
+@click.option('--port', metavar='<port>', type=click.IntRange(min=0, max=65535), default=9108, show_default=True, help='Listening port of the metrics endpoint.')
+@click.option('--num-signatures', metavar='<n>', type=click.IntRange(min=1), default=1000, show_default=True, help='numSignatures of every authorize request: the SAD is renewed before its quota runs out.')
+@click.pass_context
+def monitor(ctx, credential_id, interval, host, port, num_signatures):
+    """Probe the service until interrupted: the session is kept alive with its refresh token, metrics are served on /metrics."""
+    if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
+        raise click.UsageError('monitor requires --environment and either --user and --passw or --session')
+    csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=True, logger=ctx.obj['logger'], **dict(ctx.obj['csc_options'], response_cache=False, timing_report=None))
+    m = Monitor(csc, interval, credential_id, num_signatures, host, port)
+    signal.signal(signal.SIGINT, m.stop)
+    signal.signal(signal.SIGTERM, m.stop)
+    try:
+        m.open_session()
+    except Exception as e:
+        ctx.obj['logger'].error(CSC.highlight(e, 'red', bold=True))
+        sys.exit(1)
+    ctx.obj['logger'].info(CSC.highlight(f'Metrics available on {m.start()}', 'DeepSkyBlue2', bold=True))
+    try:
+        m.run()
+    finally:
+        m.close()
+    sys.exit(0)
+
+
 @main.command()
 @click.argument('credential_id', nargs=1)
 @click.pass_context
 def otp(ctx, credential_id):
     """Send the OTP for a credential passed as an argument"""
     if not ctx.obj['environment'] or (not ctx.obj['user'] or not ctx.obj['password']) and not ctx.obj['session']:
-        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], noout=True)
+        csc = initialize_with_TUI(quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], noout=True, **ctx.obj['csc_options'])
     else:
-        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], noout=True)
+        csc = CSC(ctx.obj['user'], ctx.obj['password'], env=ctx.obj['environment'], session_key=ctx.obj['session'], quiet=ctx.obj['quiet'], logger=ctx.obj['logger'], noout=True, **ctx.obj['csc_options'])
     csc.send_otp(credential_id)
     sys.exit(csc.get_error_level())
 
 
+@main.command(short_help='Run a local CSC mock server with latency and fault injection: use its context URL, or `-e mock\' for an in-process one.')
+@click.option('--host', metavar='<address>', default='127.0.0.1', show_default=True, help='Listening address.')
+@click.option('--port', metavar='<port>', type=click.IntRange(min=0, max=65535), default=8080, show_default=True, help='Listening port.')
+@click.option('--credentials', metavar='<n>', type=click.IntRange(min=0), default=MockCSCServer.DEFAULT_OPTIONS['credentials'], show_default=True, help='Number of credentials of the account.')
+@click.option('--latency', metavar='<ms>', type=click.FloatRange(min=0), default=MockCSCServer.DEFAULT_OPTIONS['latency'], show_default=True, help='Median response time.')
+@click.option('--jitter', metavar='<sigma>', type=click.FloatRange(min=0), default=MockCSCServer.DEFAULT_OPTIONS['jitter'], show_default=True, help='Sigma of the log-normal response time distribution, 0 for a constant response time.')
+@click.option('--sign-latency', metavar='<ms>', type=click.FloatRange(min=0), default=MockCSCServer.DEFAULT_OPTIONS['sign_latency'], show_default=True, help='Additional signHash time for every digest.')
+@click.option('--error-rate', metavar='<ratio>', type=click.FloatRange(min=0, max=1), default=MockCSCServer.DEFAULT_OPTIONS['error_rate'], show_default=True, help='Fraction of 503 responses.')
+@click.option('--drop-rate', metavar='<ratio>', type=click.FloatRange(min=0, max=1), default=MockCSCServer.DEFAULT_OPTIONS['drop_rate'], show_default=True, help='Fraction of connections closed without a response.')
+@click.option('--slow-page-rate', metavar='<ratio>', type=click.FloatRange(min=0, max=1), default=MockCSCServer.DEFAULT_OPTIONS['slow_page_rate'], show_default=True, help='Fraction of delayed credentials/list pages.')
+@click.option('--slow-page-delay', metavar='<ms>', type=click.FloatRange(min=0), default=MockCSCServer.DEFAULT_OPTIONS['slow_page_delay'], show_default=True, help='Delay of a slow credentials/list page.')
+@click.option('--max-page-size', metavar='<n>', type=click.IntRange(min=1), default=MockCSCServer.DEFAULT_OPTIONS['max_page_size'], show_default=True, help='Largest accepted credentials/list maxResults.')
+@click.option('--chain-length', metavar='<n>', type=click.IntRange(min=2), default=MockCSCServer.DEFAULT_OPTIONS['chain_length'], show_default=True, help='Certificates of a credential chain.')
+@click.option('--expired-rate', metavar='<ratio>', type=click.FloatRange(min=0, max=1), default=MockCSCServer.DEFAULT_OPTIONS['expired_rate'], show_default=True, help='Fraction of credentials with an expired certificate.')
+@click.option('--sad-ttl', metavar='<seconds>', type=click.IntRange(min=1), default=MockCSCServer.DEFAULT_OPTIONS['sad_ttl'], show_default=True, help='SAD expiresIn.')
+@click.option('--seed', metavar='<n>', type=int, default=MockCSCServer.DEFAULT_OPTIONS['seed'], show_default=True, help='Seed of the fault injection random generator.')
+def mock(host, port, **options):
+    """Serve every CSC service on a local mock server until interrupted. Any PIN but 12345678 is wrong, any username/password is accepted."""
+    server = MockCSCServer(host, port, **options)
+    server.start()
+    print(f'{CSC.highlight("CSC mock server listening on", bold=True)} {CSC.highlight(server.context, "DeepSkyBlue2")}')
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    sys.exit(0)
+
+
+@main.command(short_help='Benchmark the client side overhead of the tester against a local mock server.')
+@click.option('--sizes', metavar='<n,...>', default=','.join([ str(s) for s in SelfBenchmark.DEFAULT_SIZES ]), show_default=True, help='Number of credentials of the synthetic accounts used by the global_test/scan benchmarks.')
+@click.option('--micro-only', is_flag=True, default=False, help='Skip the global_test/scan benchmarks.')
+@click.option('--output', '-o', metavar='<path>', type=click.Path(dir_okay=False, writable=True), help='Write the results to a JSON file.')
+@click.option('--baseline', '-b', metavar='<path>', type=click.Path(exists=True, dir_okay=False), help='Compare the results with a previous JSON file: exit value 2 if any of them regressed.')
+@click.option('--results', '-r', metavar='<path>', type=click.Path(exists=True, dir_okay=False), help='Compare the results of a previous run, written by --output, with --baseline instead of running the benchmarks.')
+@click.option('--threshold', metavar='<ratio>', type=click.FloatRange(min=0), default=SelfBenchmark.DEFAULT_THRESHOLD, show_default=True, help='Slowdown tolerated before a result is reported as a regression.')
+@click.option('--startup-budget', metavar='<seconds>', type=click.FloatRange(min=0), default=SelfBenchmark.DEFAULT_STARTUP_BUDGET, show_default=True, help='Maximum startup time of the list and --version commands, on top of the bare interpreter startup: exit value 2 if exceeded.')
+@click.pass_context
+def selfbench(ctx, sizes, micro_only, output, baseline, results, threshold, startup_budget):
+    """Time the startup, the validation, output and JSON paths, then global_test and scan on synthetic accounts."""
+    try:
+        sizes = [ int(s) for s in sizes.split(',') if s.strip() != '' ]
+    except ValueError:
+        raise click.BadParameter('comma separated list of integers expected', param_hint='--sizes')
+    if results and not baseline:
+        raise click.UsageError('--results requires --baseline')
+    benchmark = SelfBenchmark(ctx.obj['logger'], ctx.obj['csc_options'])
+    if results:
+        benchmark.close()
+        try:
+            benchmark.load(results)
+            sys.exit(benchmark.compare(baseline, threshold))
+        except RuntimeError as e:
+            raise click.BadParameter(str(e).strip('* '), param_hint='--results/--baseline')
+    error_level = benchmark.startup(startup_budget)
+    benchmark.micro()
+    if not micro_only:
+        benchmark.macro(sizes)
+    benchmark.close()
+    if output:
+        benchmark.save(output)
+    if baseline:
+        error_level = max(error_level, benchmark.compare(baseline, threshold))
+    sys.exit(error_level)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csctester3  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # keep the token, logo and snapshot caches out of the user cache directory
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+@pytest.fixture
+def logger():
+    logger = logging.Logger('csctester-tests')
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+@pytest.fixture
+def mock_server():
+    # every test gets its own port, hence its own circuit breaker
+    servers = []
+
+    def start(**options):
+        server = csctester3.MockCSCServer(port=0, latency=0, **options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def run_csc(mock_server, logger):
+    # run a CSC method against a fresh mock server → (exit value, CSC object)
+    def run(method='global_test', mock_options=None, **csc_options):
+        server = mock_server(**(mock_options or {}))
+        csc = csctester3.CSC('user', 'password', context=server.context, quiet=True, logger=logger, **csc_options)
+        try:
+            getattr(csc, method)()
+            code = csc.get_error_level()
+        except SystemExit as e:
+            code = e.code
+        return code, csc
+
+    return run
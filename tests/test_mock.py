@@ -0,0 +1,74 @@
+import pytest
+from click.testing import CliRunner
+
+import csctester3
+
+# checks of a global test on the default mock account (10 credentials)
+GLOBAL_TEST_CHECKS = 224
+
+
+@pytest.mark.parametrize('csc_options', [
+    {},
+    { 'concurrent_tests': True },
+    { 'jobs': 4 }
+], ids=[ 'sequential', 'concurrent', 'jobs' ])
+def test_global_test(run_csc, csc_options):
+    code, csc = run_csc(**csc_options)
+    assert code == 0
+    assert csc.test_counts == { 'OK': GLOBAL_TEST_CHECKS, 'KO': 0 }
+
+
+def test_scan(run_csc):
+    code, csc = run_csc('scan', { 'credentials': 25 }, page_size=10)
+    assert code == 0
+    assert csc.test_counts == { 'OK': 0, 'KO': 0 }
+    # login + 3 credentials/list pages + 25 credentials/info + revoke
+    assert csc.get_request_count() == 30
+
+
+def test_no_credentials(run_csc):
+    code, csc = run_csc(mock_options={ 'credentials': 0 })
+    assert code == 2
+    assert csc.test_counts['KO'] > 0
+
+
+def test_expired_certificates(run_csc):
+    # expired credentials are reported and skipped, not counted as failures
+    code, csc = run_csc(mock_options={ 'expired_rate': 1.0 })
+    assert code == 0
+    assert csc.test_counts['KO'] == 0
+    assert 0 < csc.test_counts['OK'] < GLOBAL_TEST_CHECKS
+
+
+def test_unavailable_service(run_csc):
+    code, csc = run_csc(mock_options={ 'error_rate': 1.0 })
+    assert code == 3
+    assert csc.test_counts['OK'] == 0
+    assert csc.test_counts['KO'] > 0
+
+
+@pytest.mark.parametrize('mock_options', [
+    { 'error_rate': 0.2, 'seed': 1 },
+    { 'drop_rate': 0.2, 'seed': 1 }
+], ids=[ 'errors', 'drops' ])
+def test_faults(run_csc, mock_options):
+    code, csc = run_csc(mock_options=mock_options)
+    assert code == 3
+    assert csc.test_counts['KO'] > 0
+    assert csc.test_counts['OK'] > 0
+
+
+@pytest.mark.parametrize('args', [
+    [],
+    [ '-c' ],
+    [ '-j', '4' ],
+    [ 'scan' ]
+], ids=[ 'sequential', 'concurrent', 'jobs', 'scan' ])
+def test_cli_exit_code(tmp_path, args):
+    options = [ '-q', '-e', 'mock', '-u', 'user', '-p', 'password', '-l', str(tmp_path / 'csctester.log') ]
+    if args and args[0] == 'scan':
+        options += args
+    else:
+        options = args + options
+    result = CliRunner().invoke(csctester3.main, options)
+    assert result.exit_code == 0, result.output
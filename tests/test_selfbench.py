@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+import csctester3
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'selfbench_baseline.json')
+# the stored baseline comes from another machine: only a gross slowdown of the micro benchmarks fails
+MICRO_THRESHOLD = 4.0
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({ 'results': results }, f)
+    return str(path)
+
+
+@pytest.fixture
+def benchmark(logger):
+    benchmark = csctester3.SelfBenchmark(logger)
+    yield benchmark
+    benchmark.close()
+
+
+@pytest.mark.parametrize('value, expected', [
+    (1.0, 0),
+    (0.5, 0),
+    (1.05, 0),
+    (1.2, 2)
+], ids=[ 'same', 'faster', 'tolerated', 'slower' ])
+def test_compare(tmp_path, benchmark, value, expected):
+    baseline = write_results(tmp_path / 'baseline.json', { 'validate_response': { 'value': 10.0, 'unit': 'us' } })
+    benchmark.results['validate_response'] = { 'value': 10.0 * value, 'unit': 'us' }
+    assert benchmark.compare(baseline, threshold=0.1) == expected
+
+
+def test_compare_skips_unmatched(tmp_path, benchmark):
+    baseline = write_results(tmp_path / 'baseline.json', {
+        'validate_response': { 'value': 10.0, 'unit': 'ms' },
+        'highlight': { 'value': 0, 'unit': 'us' }
+    })
+    benchmark.results['validate_response'] = { 'value': 100.0, 'unit': 'us' }
+    benchmark.results['highlight'] = { 'value': 100.0, 'unit': 'us' }
+    benchmark.results['traverse_json'] = { 'value': 100.0, 'unit': 'us' }
+    assert benchmark.compare(baseline) == 0
+
+
+def test_invalid_baseline(tmp_path, benchmark):
+    path = tmp_path / 'baseline.json'
+    path.write_text('{}')
+    with pytest.raises(RuntimeError):
+        benchmark.compare(str(path))
+
+
+def test_micro_baseline(benchmark):
+    benchmark.micro()
+    assert set(benchmark.results) == set(csctester3.SelfBenchmark._load_results(BASELINE))
+    assert benchmark.compare(BASELINE, threshold=MICRO_THRESHOLD) == 0
+
+
+@pytest.mark.parametrize('value, exit_code', [ (1.0, 0), (2.0, 2) ], ids=[ 'same', 'slower' ])
+def test_cli_compare(tmp_path, value, exit_code):
+    baseline = write_results(tmp_path / 'baseline.json', { 'validate_response': { 'value': 10.0, 'unit': 'us' } })
+    results = write_results(tmp_path / 'results.json', { 'validate_response': { 'value': 10.0 * value, 'unit': 'us' } })
+    result = CliRunner().invoke(csctester3.main, [ '-l', str(tmp_path / 'csctester.log'), 'selfbench', '-r', results, '-b', baseline ])
+    assert result.exit_code == exit_code, result.output
+
+
+def test_cli_results_requires_baseline(tmp_path):
+    results = write_results(tmp_path / 'results.json', {})
+    result = CliRunner().invoke(csctester3.main, [ '-l', str(tmp_path / 'csctester.log'), 'selfbench', '-r', results ])
+    assert result.exit_code == 2
+    assert '--results requires --baseline' in result.output